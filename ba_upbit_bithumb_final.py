@@ -1,119 +1,223 @@
-import requests
-import pandas as pd
+import response_cache
+import exchange_adapters
+import last_good
+import market_records
+from market_records import BinancePair, BithumbPair
+from snapshot_diff import IncrementalSnapshot
+from market_index import MarketIndex, group_bases
+from report_graph import ReportGraph
+from listing_history import ListingHistory
+import listing_history
+import listing_resolver
+import report_output
+import stage_metrics
+import argparse
 from datetime import datetime
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
+from functools import partial
 import os
 
 
 class CryptoExchangeAnalyzer:
+    # 各交易所获取阶段的超时时间（秒），超时视为获取失败
+    FETCH_TIMEOUTS = {
+        'binance': 20,
+        'bithumb': 12,
+        'upbit': 12,
+        'bithumb_btc': 12,
+    }
+    # 有上次快照时等待新数据的时间（秒），超过后先使用快照，新数据在后台继续获取
+    FRESH_WAITS = {
+        'binance': 5,
+        'bithumb': 3,
+        'upbit': 3,
+        'bithumb_btc': 3,
+    }
+    # 数据源 -> 交易所（写入上币历史时使用）
+    SOURCE_VENUES = {
+        'binance': 'binance',
+        'bithumb': 'bithumb',
+        'upbit': 'upbit',
+        'bithumb_btc': 'bithumb',
+    }
+    # Upbit交易对工作表：(工作表名, 报价货币, 筛选的分类（None为全部交易对）, 基础货币列的值)
+    PAIR_SHEETS = [
+        ('Upbit_KRW_pairs', 'KRW', None, None),
+        ('Upbit_USDT_pairs', 'USDT', None, None),
+        ('Upbit_BTC_pairs', 'BTC', None, None),
+        ('Upbit_only_KRW', 'KRW', 'Upbit_only_KRW', 'KRW'),
+        ('Upbit_only_USDT', 'USDT', 'Upbit_only_USDT', 'USDT'),
+        ('Upbit_only_BTC', 'BTC', 'Upbit_only_BTC', 'BTC'),
+        ('Upbit_all_markets', 'KRW', 'Upbit_all_markets', None),
+        ('Upbit_USDT_BTC_not_KRW', 'USDT', 'Upbit_USDT_BTC_not_KRW', None),
+    ]
+    # 交易所间比较结果及ba_bithumb与usdt_btc_not_krw的比较结果：(工作表名, 列名, 是否排序)
+    SET_SHEETS = [
+        ('All_Exchanges', 'Asset', False),
+        ('Only_Binance', 'Asset', False),
+        ('Only_Upbit', 'Asset', False),
+        ('Only_Bithumb', 'Asset', False),
+        ('Binance_Upbit', 'Asset', False),
+        ('Binance_Bithumb', 'Asset', False),
+        ('Bithumb_Upbit', 'Asset', False),
+        ('Common_Pairs', 'Common Pairs', True),
+        ('Only_Binance_Bithumb', 'Only in Binance_Bithumb', True),
+        ('Only_Upbit_USDT_BTC', 'Only in Upbit_USDT_BTC', True),
+    ]
+    # 报表中各获取状态的说明
+    STATUS_LABELS = {
+        last_good.STALE: '使用上次快照',
+        last_good.FAILED: '获取失败',
+    }
+
     def __init__(self):
         self.output_dir = "output"
         os.makedirs(self.output_dir, exist_ok=True)
-        self.upbit_markets = None
         self.listing_dates = {}  # 存储上币日期数据
-
-    def get_binance_usdt_pairs(self):
-        """获取币安USDT交易对"""
-        url = "https://api.binance.com/api/v3/exchangeInfo"
-        try:
-            print("获取币安USDT交易对...")
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            usdt_pairs = []
-            for symbol in data['symbols']:
-                if (symbol['quoteAsset'] == 'USDT'
-                        and symbol['status'] == 'TRADING'
-                        and symbol['isSpotTradingAllowed']):
-                    price_filter = next((f for f in symbol['filters'] if f['filterType'] == 'PRICE_FILTER'), {})
-                    lot_size_filter = next((f for f in symbol['filters'] if f['filterType'] == 'LOT_SIZE'), {})
-
-                    pair_info = {
-                        'Symbol': symbol['symbol'],
-                        'Base Asset': symbol['baseAsset'],
-                        'Quote Asset': symbol['quoteAsset'],
-                        'Price Precision': price_filter.get('tickSize', 'N/A'),
-                        'Min Qty': lot_size_filter.get('minQty', 'N/A'),
-                        'Qty Precision': lot_size_filter.get('stepSize', 'N/A'),
-                        'Listing Date': datetime.fromtimestamp(symbol['onboardDate'] / 1000).strftime('%Y-%m-%d')
-                        if 'onboardDate' in symbol else 'N/A'
-                    }
-                    usdt_pairs.append(pair_info)
-                    # 保存上币日期
-                    if 'onboardDate' in symbol:
-                        self.listing_dates[symbol['baseAsset']] = datetime.fromtimestamp(
-                            symbol['onboardDate'] / 1000).strftime('%Y-%m-%d')
-
-            print(f"找到 {len(usdt_pairs)} 个币安USDT交易对")
-            return pd.DataFrame(usdt_pairs)
-        except Exception as e:
-            print(f"获取币安数据失败: {e}")
-            return pd.DataFrame()
-
-    def get_bithumb_krw_pairs(self):
-        """获取Bithumb KRW交易对"""
-        try:
-            print("获取Bithumb KRW交易对...")
-            url = "https://api.bithumb.com/public/ticker/ALL_KRW"
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            krw_pairs = []
-            for currency in data['data']:
-                if currency == 'date':
+        self.fetch_timings = {}  # 存储各交易所获取耗时（秒）
+        self.venue_status = {}  # 存储各交易所的获取状态及数据时间
+        self.snapshot = IncrementalSnapshot()  # 上一次快照及派生分类，重复分析时按增量更新
+        self.graph = self.build_graph()  # 各工作表及其依赖的计算图
+
+    def save_binance_listing_dates(self, usdt_pairs):
+        """保存币安交易对的上币日期"""
+        for pair in usdt_pairs:
+            if pair.listing_date != 'N/A':
+                self.listing_dates[pair.base] = pair.listing_date
+
+    def fetch_exchanges(self, venues=None):
+        """并发获取交易所数据，返回{数据源: 数据}（币安、Bithumb为交易对记录列表，Upbit为市场列表）
+
+        venues指定时只获取这些交易所。获取失败或没有及时返回的交易所使用上次成功获取的快照，
+        状态记录在self.venue_status中；本次新获取的交易所写入上币历史。
+        """
+        binance = exchange_adapters.ADAPTERS['binance']()
+        bithumb = exchange_adapters.ADAPTERS['bithumb']()
+        upbit = exchange_adapters.ADAPTERS['upbit']()
+        fetchers = {
+            'binance': (binance.usdt_pairs, partial(market_records.from_rows, BinancePair)),
+            'bithumb': (bithumb.pairs, partial(market_records.from_rows, BithumbPair)),
+            'upbit': (upbit.market_details, list),
+            'bithumb_btc': (partial(bithumb.pairs, 'BTC'), partial(market_records.from_rows, BithumbPair)),
+        }
+        if venues is not None:
+            fetchers = {name: fetcher for name, fetcher in fetchers.items() if name in venues}
+        if not fetchers:
+            return {}
+
+        results, self.venue_status = last_good.fetch_with_fallback(fetchers, self.FETCH_TIMEOUTS, self.FRESH_WAITS,
+                                                                   self.fetch_timings)
+
+        # 获取函数只返回结果，上币日期在这里（主线程）更新，超时后才返回的数据不会混入本次分析
+        if 'binance' in results:
+            self.save_binance_listing_dates(results['binance'])
+        if 'upbit' in results and self.venue_status['upbit'][0] == last_good.FRESH:
+            # Upbit API不直接提供上币日期，先标记为未知，分析时再按K线和上币历史补全；setdefault不覆盖币安的真实日期
+            for market in results['upbit']:
+                self.listing_dates.setdefault(market['market'].split('-')[1], "未知")
+        self.record_history(results)
+        return results
+
+    def record_history(self, results):
+        """把本次新获取的交易所快照写入上币历史"""
+        seen_at = listing_history.now()
+        with ListingHistory() as history:
+            for source, data in results.items():
+                # 快照不代表此刻仍然上架，获取失败的交易所为空，都不记录
+                if self.venue_status[source][0] != last_good.FRESH:
                     continue
-                krw_pairs.append({
-                    'Market': f'KRW-{currency}',
-                    'Currency': currency,
-                    'Korean Name': '',
-                    'English Name': ''
-                })
-
-            print(f"找到 {len(krw_pairs)} 个Bithumb KRW交易对")
-            return pd.DataFrame(krw_pairs)
-        except Exception as e:
-            print(f"获取Bithumb数据失败: {e}")
-            return pd.DataFrame()
-
-    def get_upbit_markets(self):
-        """获取Upbit交易所的所有市场信息"""
-        if self.upbit_markets is None:
-            url = "https://api.upbit.com/v1/market/all"
-            headers = {"accept": "application/json", 'User-Agent': 'Mozilla/5.0'}
-            try:
-                print("获取Upbit市场信息...")
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                self.upbit_markets = response.json()
-                # 提取上币日期（Upbit API不直接提供，这里使用模拟值）
-                for market in self.upbit_markets:
-                    base_currency = market['market'].split('-')[1]
-                    if base_currency not in self.listing_dates:
-                        self.listing_dates[base_currency] = "未知"
-            except requests.exceptions.RequestException as e:
-                print(f"获取Upbit数据失败: {e}")
-                self.upbit_markets = []
-        return self.upbit_markets
-
-    def filter_pairs(self, prefix):
-        """从市场信息中筛选出特定前缀的交易对"""
-        markets = self.get_upbit_markets()
-        return [market for market in markets if market['market'].startswith(prefix)]
-
-    def sort_by_listing_date(self, pairs):
-        """按上币日期对交易对进行排序"""
-        # 使用上币日期排序，未知日期的交易对放在最后
-        return sorted(pairs,
-                      key=lambda x: self.listing_dates.get(x['market'].split('-')[1], '9999-99-99'))
-
-    def save_to_excel(self, pairs, sheet_name, writer, base_currency=None):
-        """将交易对信息保存到Excel的指定工作表中"""
-        workbook = writer.book
-
+                if source == 'upbit':
+                    markets = [tuple(market['market'].split('-', 1)) for market in data]
+                else:
+                    markets = [(pair.quote, pair.base) for pair in data]
+                history.record(self.SOURCE_VENUES[source], markets, seen_at)
+
+    def upbit_candle_dates(self, upbit_markets):
+        """返回{币种: Upbit最早日K线的日期}，查过的交易对不再请求"""
+        markets = [tuple(market['market'].split('-', 1)) for market in upbit_markets]
+        return listing_resolver.asset_dates(listing_resolver.resolve('upbit', markets))
+
+    def fill_listing_dates(self, candle_dates):
+        """补全没有真实上币日期的币种
+
+        币安的上币日期优先，其次是Upbit最早日K线的日期，都没有时使用上币历史中观察到的首次出现日期；
+        开始记录时就已上架的币种没有观察到的日期，保持"未知"。
+        """
+        with ListingHistory() as history:
+            first_seen = history.listing_dates()
+        for dates in (candle_dates, first_seen):
+            for asset, date in dates.items():
+                if self.listing_dates.get(asset, "未知") == "未知":
+                    self.listing_dates[asset] = date
+
+    def build_upbit_index(self, upbit_markets, candle_dates):
+        """补全上币日期后建立Upbit市场索引：只解析一次，按报价货币分组并按上币日期排好序"""
+        self.fill_listing_dates(candle_dates)
+        return MarketIndex(upbit_markets, self.listing_dates)
+
+    def update_upbit_categories(self, by_quote):
+        """用本次Upbit快照（{报价货币: 币种列表}）增量更新各分类：只有新增或移除的币种会被重新归类"""
+        self.snapshot.update_upbit_quotes(by_quote)
+        return self.snapshot.results
+
+    def update_exchange_categories(self, binance_assets, bithumb_assets, upbit_categories):
+        """在已按Upbit快照更新的分类上，再用币安和Bithumb快照增量更新，返回快照的全部分类
+
+        upbit_categories只用来保证Upbit的分类先更新，不读取它的值。
+        """
+        self.snapshot.update('Binance_USDT', binance_assets)
+        self.snapshot.update('Bithumb_KRW', bithumb_assets)
+        return self.snapshot.results
+
+    def pair_sheet(self, sheet_name, quote, category, base_currency, index, categories=None):
+        """Upbit交易对工作表：报价货币下的全部交易对，或其中属于某个分类的（索引已排序，筛选结果保持顺序）"""
+        pairs = index.pairs(quote) if category is None else index.select(quote, categories[category])
+        return self.pairs_frame(pairs, sheet_name, base_currency)
+
+    def set_sheet(self, sheet_name, column, sort, categories):
+        """币种集合工作表"""
+        # pandas只在生成工作表时导入，获取和分类阶段不需要
+        import pandas as pd
+        assets = sorted(categories[sheet_name]) if sort else categories[sheet_name]
+        return pd.DataFrame(assets, columns=[column])
+
+    def build_graph(self):
+        """声明报表计算图：交易所数据 -> 币种集合/Upbit索引 -> 分类 -> 各工作表
+
+        分类只用到各报价市场的币种集合；只有显示上币日期的Upbit交易对工作表依赖K线上币日期和排好序的索引，
+        只选择币种集合工作表时不会查询K线。
+        """
+        graph = ReportGraph()
+        for venue in self.FETCH_TIMEOUTS:
+            graph.source(venue)
+        graph.add('binance_assets', ['binance'], market_records.assets)
+        graph.add('bithumb_assets', ['bithumb'], market_records.assets)
+        graph.add('upbit_candle_dates', ['upbit'], self.upbit_candle_dates)
+        graph.add('upbit_index', ['upbit', 'upbit_candle_dates'], self.build_upbit_index)
+        graph.add('upbit_bases', ['upbit'], group_bases)
+        graph.add('upbit_categories', ['upbit_bases'], self.update_upbit_categories)
+        # upbit_categories只是顺序依赖：快照中交易所间的分类要在Upbit的币种集合更新之后计算
+        graph.add('exchange_categories', ['binance_assets', 'bithumb_assets', 'upbit_categories'],
+                  self.update_exchange_categories)
+
+        for sheet_name, quote, category, base_currency in self.PAIR_SHEETS:
+            deps = ['upbit_index'] if category is None else ['upbit_index', 'upbit_categories']
+            graph.add(sheet_name, deps, partial(self.pair_sheet, sheet_name, quote, category, base_currency),
+                      output=True)
+        for sheet_name, column, sort in self.SET_SHEETS:
+            graph.add(sheet_name, ['exchange_categories'], partial(self.set_sheet, sheet_name, column, sort),
+                      output=True)
+        return graph
+
+    def stale_venues_frame(self):
+        """返回没有使用新数据的交易所及其数据时间"""
+        import pandas as pd
+        rows = [(venue, self.STATUS_LABELS[state], f"{data_time:%Y-%m-%d %H:%M:%S}" if data_time else '')
+                for venue, (state, data_time) in self.venue_status.items() if state != last_good.FRESH]
+        return pd.DataFrame(rows, columns=['交易所', '状态', '数据时间'])
+
+    def pairs_frame(self, pairs, sheet_name, base_currency=None):
+        """把交易对信息整理为报表的DataFrame"""
+        import pandas as pd
         # 如果没有数据，创建空的DataFrame
         if not pairs:
             df = pd.DataFrame(columns=[
@@ -137,10 +241,10 @@ class CryptoExchangeAnalyzer:
             else:
                 df['基础货币'] = sheet_name.split('_')[0].upper()
 
-            df['报价货币'] = df['交易对代码'].apply(lambda x: x.split('-')[1])
+            df['报价货币'] = df['交易对代码'].str.split('-', n=1).str[1]
 
             # 添加上币日期列
-            df['上币日期'] = df['报价货币'].apply(lambda x: self.listing_dates.get(x, '未知'))
+            df['上币日期'] = df['报价货币'].map(self.listing_dates).fillna('未知')
 
         # 确保所有列存在
         required_columns = ['交易对代码', '基础货币', '报价货币', '韩文名称', '英文名称', '上币日期']
@@ -151,151 +255,76 @@ class CryptoExchangeAnalyzer:
             df['市场警告'] = ''
             required_columns.append('市场警告')
 
-        df = df[required_columns]
-
-        # 写入Excel
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
-        worksheet = workbook[sheet_name]
-
-        # 设置列宽
-        for i, col in enumerate(df.columns):
-            column_width = max(len(str(x)) for x in df[col]) if not df.empty else len(col)
-            column_width = max(column_width, len(col)) + 2
-            col_letter = get_column_letter(i + 1)
-            worksheet.column_dimensions[col_letter].width = column_width
-
-        # 设置表头样式
-        if not df.empty:
-            header_font = Font(bold=True)
-            header_alignment = Alignment(vertical='top', wrap_text=True)
-            header_border = Border(left=Side(style='thin'), right=Side(style='thin'),
-                                   top=Side(style='thin'), bottom=Side(style='thin'))
-            header_fill = PatternFill(start_color='D7E4BC', end_color='D7E4BC', fill_type='solid')
-
-            for col_num, value in enumerate(df.columns.values):
-                cell = worksheet.cell(row=1, column=col_num + 1, value=value)
-                cell.font = header_font
-                cell.alignment = header_alignment
-                cell.border = header_border
-                cell.fill = header_fill
-
-        print(f"{sheet_name} 工作表已创建，共 {len(df)} 条记录")
-
-    def analyze_exchanges(self):
-        """执行所有分析并生成综合Excel报告"""
-        print("=== 加密货币交易所数据分析工具 ===")
+        return df[required_columns]
 
-        # 获取各交易所数据
-        binance_df = self.get_binance_usdt_pairs()
-        bithumb_df = self.get_bithumb_krw_pairs()
-        upbit_markets = self.get_upbit_markets()
+    def analyze_exchanges(self, output_format='xlsx', sidecar=None, outputs=None):
+        """执行分析并生成综合报告
 
-        # 处理币安数据
-        if not binance_df.empty:
-            binance_assets = set(binance_df['Base Asset'])
-        else:
-            binance_assets = set()
+        outputs为要生成的工作表列表，默认全部；只获取这些工作表用到的交易所。
+        output_format为xlsx时写Excel文件，否则把每个分类写为目录中的一个文件；
+        sidecar指定格式时在报表旁边额外写一个分类币种长表。
+        """
+        print("=== 加密货币交易所数据分析工具 ===")
 
-        # 处理Bithumb数据
-        if not bithumb_df.empty:
-            bithumb_assets = set(bithumb_df['Currency'])
-        else:
-            bithumb_assets = set()
-
-        # 处理Upbit数据并筛选不同类型交易对
-        krw_pairs = self.sort_by_listing_date(self.filter_pairs('KRW-'))
-        usdt_pairs = self.sort_by_listing_date(self.filter_pairs('USDT-'))
-        btc_pairs = self.sort_by_listing_date(self.filter_pairs('BTC-'))
-
-        # 提取Upbit交易对基础货币 - 修复：定义upbit_assets
-        upbit_assets = {pair['market'].split('-')[1] for pair in upbit_markets}
-        krw_assets = {pair['market'].split('-')[1] for pair in krw_pairs}
-        usdt_assets = {pair['market'].split('-')[1] for pair in usdt_pairs}
-        btc_assets = {pair['market'].split('-')[1] for pair in btc_pairs}
-
-        # 计算Upbit特定交易对组合
-        only_krw = self.sort_by_listing_date(
-            [pair for pair in krw_pairs if
-             pair['market'].split('-')[1] not in usdt_assets and pair['market'].split('-')[1] not in btc_assets]
-        )
-        only_usdt = self.sort_by_listing_date(
-            [pair for pair in usdt_pairs if
-             pair['market'].split('-')[1] not in krw_assets and pair['market'].split('-')[1] not in btc_assets]
-        )
-        only_btc = self.sort_by_listing_date(
-            [pair for pair in btc_pairs if
-             pair['market'].split('-')[1] not in krw_assets and pair['market'].split('-')[1] not in usdt_assets]
-        )
-
-        all_upbit_markets = self.sort_by_listing_date(
-            [pair for pair in krw_pairs if
-             pair['market'].split('-')[1] in usdt_assets and pair['market'].split('-')[1] in btc_assets]
-        )
-
-        usdt_btc_not_krw = self.sort_by_listing_date(
-            [pair for pair in usdt_pairs if
-             pair['market'].split('-')[1] in btc_assets and pair['market'].split('-')[1] not in krw_assets]
-        )
-
-        # 计算交易所间的交易对组合
-        all_three_exchanges = binance_assets & upbit_assets & bithumb_assets
-        only_binance = binance_assets - upbit_assets - bithumb_assets
-        only_upbit = upbit_assets - binance_assets - bithumb_assets
-        only_bithumb = bithumb_assets - binance_assets - upbit_assets
-        binance_upbit = binance_assets & upbit_assets - bithumb_assets
-        binance_bithumb = binance_assets & bithumb_assets - upbit_assets
-        bithumb_upbit = bithumb_assets & upbit_assets - binance_assets
-
-
-        # 计算ba_bithumb与usdt_btc_not_krw的比较结果
-        # ba_bithumb_assets = binance_bithumb
-        binance_bithumb_not_upbit_krw = binance_assets & bithumb_assets - krw_assets
-        usdt_btc_not_krw_assets = {pair['market'].split('-')[1] for pair in usdt_btc_not_krw}
-
-        common_pairs = sorted(binance_bithumb_not_upbit_krw & usdt_btc_not_krw_assets)
-        only_in_ba_bithumb = sorted(binance_bithumb_not_upbit_krw - usdt_btc_not_krw_assets)
-        only_in_upbit = sorted(usdt_btc_not_krw_assets - binance_bithumb_not_upbit_krw)
+        # 只获取、解析和计算所选工作表需要的部分
+        outputs = outputs or self.graph.outputs
+        values = self.graph.run(outputs, self.fetch_exchanges)
+        tables = {name: values[name] for name in self.graph.outputs if name in outputs}
+        with stage_metrics.stage('final', stage_metrics.WRITE):
+            self.write_report(tables, output_format, sidecar)
+        print("程序执行完毕！")
+
+    def write_report(self, tables, output_format='xlsx', sidecar=None, stem=None):
+        """把{工作表名: DataFrame}写为综合报告，stem为不带扩展名的输出路径，默认按当前时间生成"""
+        pair_sheets = {sheet_name for sheet_name, _, _, _ in self.PAIR_SHEETS}
 
         # 生成输出文件名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(self.output_dir, f"Crypto_Exchange_Analysis_{timestamp}.xlsx")
-
-        # 写入Excel文件
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-            # 写入Upbit各类型交易对
-            self.save_to_excel(krw_pairs, 'Upbit_KRW_pairs', writer)
-            self.save_to_excel(usdt_pairs, 'Upbit_USDT_pairs', writer)
-            self.save_to_excel(btc_pairs, 'Upbit_BTC_pairs', writer)
-            self.save_to_excel(only_krw, 'Upbit_only_KRW', writer, 'KRW')
-            self.save_to_excel(only_usdt, 'Upbit_only_USDT', writer, 'USDT')
-            self.save_to_excel(only_btc, 'Upbit_only_BTC', writer, 'BTC')
-            self.save_to_excel(all_upbit_markets, 'Upbit_all_markets', writer)
-            self.save_to_excel(usdt_btc_not_krw, 'Upbit_USDT_BTC_not_KRW', writer)
-
-            # 写入交易所间比较结果
-            pd.DataFrame(all_three_exchanges, columns=['Asset']).to_excel(writer, sheet_name='All_Exchanges',
-                                                                          index=False)
-            pd.DataFrame(only_binance, columns=['Asset']).to_excel(writer, sheet_name='Only_Binance', index=False)
-            pd.DataFrame(only_upbit, columns=['Asset']).to_excel(writer, sheet_name='Only_Upbit', index=False)
-            pd.DataFrame(only_bithumb, columns=['Asset']).to_excel(writer, sheet_name='Only_Bithumb', index=False)
-            pd.DataFrame(binance_upbit, columns=['Asset']).to_excel(writer, sheet_name='Binance_Upbit', index=False)
-            pd.DataFrame(binance_bithumb, columns=['Asset']).to_excel(writer, sheet_name='Binance_Bithumb', index=False)
-            pd.DataFrame(bithumb_upbit, columns=['Asset']).to_excel(writer, sheet_name='Bithumb_Upbit', index=False)
-
-            # 写入ba_bithumb与usdt_btc_not_krw的比较结果
-            pd.DataFrame(common_pairs, columns=["Common Pairs"]).to_excel(writer, sheet_name="Common_Pairs",
-                                                                          index=False)
-            pd.DataFrame(only_in_ba_bithumb, columns=["Only in Binance_Bithumb"]).to_excel(writer,
-                                                                                           sheet_name="Only_Binance_Bithumb",
-                                                                                           index=False)
-            pd.DataFrame(only_in_upbit, columns=["Only in Upbit_USDT_BTC"]).to_excel(writer,
-                                                                                     sheet_name="Only_Upbit_USDT_BTC",
-                                                                                     index=False)
-
-        print(f"\n所有分析数据已保存到: {filename}")
-        print("程序执行完毕！")
+        if stem is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            stem = os.path.join(self.output_dir, f"Crypto_Exchange_Analysis_{timestamp}")
+
+        # 写入报表：Excel中交易对工作表列宽按内容设置，有数据时表头使用报表样式
+        with report_output.open_writer(stem, output_format) as writer:
+            for sheet_name, df in tables.items():
+                if sheet_name in pair_sheets:
+                    writer.write_sheet(sheet_name, df, styled=True, fit_columns=True)
+                    print(f"{sheet_name} 工作表已创建，共 {len(df)} 条记录")
+                else:
+                    writer.write_sheet(sheet_name, df)
+            # 有交易所使用快照或获取失败时，在报表中标出
+            stale_table = self.stale_venues_frame()
+            if not stale_table.empty:
+                writer.write_sheet('Stale_Venues', stale_table, fit_columns=True)
+
+        print(f"\n所有分析数据已保存到: {writer.filename}")
+        if sidecar:
+            # 交易对工作表取基础货币（报价货币列），其余工作表只有一列币种
+            sets = {name: df[report_output.ASSET_COLUMN] if name in pair_sheets else df.iloc[:, 0]
+                    for name, df in tables.items()}
+            print(f"分类币种列表已保存到: {report_output.write_sidecar(sets, writer.filename, sidecar)}")
+        return writer.filename
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="加密货币交易所数据分析工具")
+    parser.add_argument('--refresh', action='store_true', help="忽略本地缓存，强制重新获取交易所数据")
+    report_output.add_arguments(parser)
+    sheet_names = [sheet[0] for sheet in CryptoExchangeAnalyzer.PAIR_SHEETS + CryptoExchangeAnalyzer.SET_SHEETS]
+    parser.add_argument('--outputs', nargs='+', metavar='SHEET', choices=sheet_names,
+                        help="只生成这些工作表（默认全部），只获取它们用到的交易所")
+    parser.add_argument('--list-outputs', action='store_true', help="列出可选的工作表及其用到的交易所")
+    stage_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    report_output.validate_args(parser, args)
+    response_cache.set_refresh(args.refresh)
+
     analyzer = CryptoExchangeAnalyzer()
-    analyzer.analyze_exchanges()
\ No newline at end of file
+    if args.list_outputs:
+        for sheet_name in analyzer.graph.outputs:
+            print(f"{sheet_name}: {', '.join(analyzer.graph.sources_for([sheet_name]))}")
+    else:
+        stage_metrics.configure(args)
+        try:
+            analyzer.analyze_exchanges(args.format, args.sidecar, args.outputs)
+        finally:
+            stage_metrics.export(args)
\ No newline at end of file
@@ -1,127 +1,51 @@
-import requests
+import response_cache
+from ba_upbit_bithumb_listing import fetch_listing_frames
+import argparse
 import pandas as pd
 from datetime import datetime
 import os
 
 
+def asset_frames(binance_df, upbit_df, bithumb_df):
+    """把三家交易所的交易对统一为只有Asset一列的DataFrame，不修改传入的数据"""
+    # 统一列名为Asset，rename/assign都返回新的DataFrame
+    if not binance_df.empty:
+        binance_df = binance_df[['Base Asset']].rename(columns={'Base Asset': 'Asset'})
+
+    if not upbit_df.empty:
+        upbit_df = upbit_df.assign(Asset=upbit_df['Market'].str.replace('KRW-', ''))[['Asset']]
+
+    if not bithumb_df.empty:
+        bithumb_df = bithumb_df[['Currency']].rename(columns={'Currency': 'Asset'})
+    return binance_df, upbit_df, bithumb_df
+
+
 class ExchangeListings:
     def __init__(self):
         self.output_dir = "output"
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def get_binance_usdt_pairs(self):
-        """获取币安USDT交易对"""
-        url = "https://api.binance.com/api/v3/exchangeInfo"
-        try:
-            print("获取币安USDT交易对...")
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            usdt_pairs = []
-            for symbol in data['symbols']:
-                if (symbol['quoteAsset'] == 'USDT'
-                        and symbol['status'] == 'TRADING'
-                        and symbol['isSpotTradingAllowed']):
-                    price_filter = next((f for f in symbol['filters'] if f['filterType'] == 'PRICE_FILTER'), {})
-                    lot_size_filter = next((f for f in symbol['filters'] if f['filterType'] == 'LOT_SIZE'), {})
-
-                    pair_info = {
-                        'Symbol': symbol['symbol'],
-                        'Base Asset': symbol['baseAsset'],
-                        'Quote Asset': symbol['quoteAsset'],
-                        'Price Precision': price_filter.get('tickSize', 'N/A'),
-                        'Min Qty': lot_size_filter.get('minQty', 'N/A'),
-                        'Qty Precision': lot_size_filter.get('stepSize', 'N/A'),
-                        'Listing Date': datetime.fromtimestamp(symbol['onboardDate'] / 1000).strftime('%Y-%m-%d')
-                        if 'onboardDate' in symbol else 'N/A'
-                    }
-                    usdt_pairs.append(pair_info)
-
-            print(f"找到 {len(usdt_pairs)} 个币安USDT交易对")
-            return pd.DataFrame(usdt_pairs)
-        except Exception as e:
-            print(f"获取币安数据失败: {e}")
-            return pd.DataFrame()
-
-    def get_bithumb_krw_pairs(self):
-        """获取Bithumb KRW交易对"""
-        try:
-            print("获取Bithumb KRW交易对...")
-            url = "https://api.bithumb.com/public/ticker/ALL_KRW"
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            krw_pairs = []
-            for currency in data['data']:
-                if currency == 'date':
-                    continue
-                krw_pairs.append({
-                    'Market': f'KRW-{currency}',
-                    'Currency': currency,
-                    'Korean Name': '',
-                    'English Name': ''
-                })
-
-            print(f"找到 {len(krw_pairs)} 个Bithumb KRW交易对")
-            return pd.DataFrame(krw_pairs)
-        except Exception as e:
-            print(f"获取Bithumb数据失败: {e}")
-            return pd.DataFrame()
-
-    def get_upbit_krw_pairs(self):
-        """获取Upbit KRW交易对"""
-        try:
-            print("获取Upbit KRW交易对...")
-            url = "https://api.upbit.com/v1/market/all"
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            markets = response.json()
-
-            krw_pairs = []
-            for market in markets:
-                if market['market'].startswith('KRW-'):
-                    krw_pairs.append({
-                        'Market': market['market'],
-                        'Korean Name': market['korean_name'],
-                        'English Name': market['english_name']
-                    })
-
-            print(f"找到 {len(krw_pairs)} 个Upbit KRW交易对")
-            return pd.DataFrame(krw_pairs)
-        except Exception as e:
-            print(f"获取Upbit数据失败: {e}")
-            return pd.DataFrame()
-
     def save_to_excel(self):
         """保存到Excel文件，每个交易所一个sheet"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(self.output_dir, f"Exchange_Listings_{timestamp}.xlsx")
+        self.write_excel(*asset_frames(*fetch_listing_frames()))
+
+    def write_excel(self, binance_df, upbit_df, bithumb_df, filename=None):
+        """把asset_frames整理后的币种写入Excel文件，filename默认按当前时间生成"""
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = os.path.join(self.output_dir, f"Exchange_Listings_{timestamp}.xlsx")
 
         with pd.ExcelWriter(filename, engine='xlsxwriter') as writer:
             # 币安数据
-            binance_df = self.get_binance_usdt_pairs()
             if not binance_df.empty:
-                binance_df = binance_df[['Base Asset']]
-                binance_df.columns = ['Asset']  # 统一列名
                 binance_df.to_excel(writer, sheet_name='Binance_USDT', index=False)
 
             # Upbit数据
-            upbit_df = self.get_upbit_krw_pairs()
             if not upbit_df.empty:
-                upbit_df['Market'] = upbit_df['Market'].str.replace('KRW-', '')
-                upbit_df = upbit_df[['Market']]
-                upbit_df.columns = ['Asset']  # 统一列名
                 upbit_df.to_excel(writer, sheet_name='Upbit_KRW', index=False)
 
             # Bithumb数据
-            bithumb_df = self.get_bithumb_krw_pairs()
             if not bithumb_df.empty:
-                bithumb_df = bithumb_df[['Currency']]
-                bithumb_df.columns = ['Asset']  # 统一列名
                 bithumb_df.to_excel(writer, sheet_name='Bithumb_KRW', index=False)
 
             # 设置格式
@@ -131,9 +55,15 @@ class ExchangeListings:
                 worksheet.set_column('A:A', 15)
 
         print(f"\n数据已保存到: {filename}")
+        return filename
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="交易所上币情况整合工具")
+    parser.add_argument('--refresh', action='store_true', help="忽略本地缓存，强制重新获取交易所数据")
+    args = parser.parse_args()
+    response_cache.set_refresh(args.refresh)
+
     print("=== 交易所上币情况整合工具 ===")
     print("正在获取币安、Upbit和Bithumb的上币信息...")
 
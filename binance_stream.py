@@ -0,0 +1,108 @@
+import codecs
+import json
+import re
+from datetime import datetime
+
+import exchange_schemas
+
+# exchangeInfo中symbols数组的起始位置
+_SYMBOLS_START = re.compile(r'"symbols"\s*:\s*\[')
+# 数组元素之间的空白和逗号
+_SEPARATORS = re.compile(r'[\s,]*')
+# 未找到symbols时保留的尾部长度，防止键名被截断在两个数据块之间
+_KEY_TAIL = 32
+
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_symbols(chunks, predicate=None):
+    """逐块解析exchangeInfo响应，逐个产出symbols数组中满足条件的交易对
+
+    每次只解码一个交易对对象，内存中只保留当前数据块和未解析完的尾部，
+    无需先构建完整的对象树。
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    in_array = False
+
+    for chunk in chunks:
+        buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+
+        if not in_array:
+            match = _SYMBOLS_START.search(buffer)
+            if match is None:
+                buffer = buffer[-_KEY_TAIL:]
+                continue
+            pos = match.end()
+            in_array = True
+
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == ']':
+                # 读完剩余内容，保证响应能被完整缓存
+                for _ in chunks:
+                    pass
+                return
+            try:
+                symbol, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 当前对象还不完整，等待下一个数据块
+                break
+            pos = end
+            if predicate is None or predicate(symbol):
+                yield symbol
+
+    raise ValueError("exchangeInfo响应不完整：未找到完整的symbols数组")
+
+
+def is_usdt_spot_trading(symbol):
+    """是否为处于交易状态的USDT现货交易对"""
+    return (symbol['quoteAsset'] == 'USDT'
+            and symbol['status'] == 'TRADING'
+            and symbol['isSpotTradingAllowed'])
+
+
+def usdt_pair_row(symbol):
+    """将交易对转换为报表行（按market_records.BINANCE_PAIR_COLUMNS排列），只遍历一次filters"""
+    price_filter = lot_size_filter = None
+    for f in symbol['filters']:
+        filter_type = f['filterType']
+        if filter_type == 'PRICE_FILTER' and price_filter is None:
+            price_filter = f
+        elif filter_type == 'LOT_SIZE' and lot_size_filter is None:
+            lot_size_filter = f
+    price_filter = price_filter or {}
+    lot_size_filter = lot_size_filter or {}
+
+    return (
+        symbol['symbol'],
+        symbol['baseAsset'],
+        symbol['quoteAsset'],
+        price_filter.get('tickSize', 'N/A'),
+        lot_size_filter.get('minQty', 'N/A'),
+        lot_size_filter.get('stepSize', 'N/A'),
+        datetime.fromtimestamp(symbol['onboardDate'] / 1000).strftime('%Y-%m-%d')
+        if 'onboardDate' in symbol else 'N/A'
+    )
+
+
+def iter_usdt_pairs(response, chunk_size=CHUNK_SIZE):
+    """从exchangeInfo响应流中逐个产出USDT现货交易对的报表行"""
+    for symbol in iter_symbols(response.iter_content(chunk_size), is_usdt_spot_trading):
+        yield usdt_pair_row(symbol)
+
+
+def parse_usdt_pairs(response):
+    """从exchangeInfo响应中提取USDT现货交易对的报表行列表
+
+    响应已在本地缓存中且安装了msgspec时按schema一次性快速解码，否则边下载边解析。
+    """
+    if exchange_schemas.HAS_MSGSPEC and getattr(response, 'from_cache', False):
+        return exchange_schemas.decode_binance_usdt_pairs(response.content)
+    return list(iter_usdt_pairs(response))
@@ -1,87 +1,87 @@
-import requests
-import pandas as pd
+import response_cache
+import exchange_adapters
+import argparse
 from datetime import datetime
 import os
+from excel_writer import ReportWriter
+from listing_history import ListingHistory
 
 
 def fetch_bithumb_markets():
     """获取Bithumb的KRW和BTC交易对并进行比较"""
+    bithumb = exchange_adapters.ADAPTERS['bithumb']()
     try:
-        # 获取KRW市场交易对
-        krw_response = requests.get("https://api.bithumb.com/public/ticker/ALL_KRW")
-        krw_data = krw_response.json()
-
-        # 获取BTC市场交易对
-        btc_response = requests.get("https://api.bithumb.com/public/ticker/ALL_BTC")
-        btc_data = btc_response.json()
-
-        # 提取KRW市场交易对列表
-        krw_pairs = []
-        for symbol in krw_data.get('data', {}).keys():
-            if symbol != 'date':  # 排除时间戳字段
-                krw_pairs.append(f'KRW-{symbol}')
-
-        # 提取BTC市场交易对列表
-        btc_pairs = []
-        for symbol in btc_data.get('data', {}).keys():
-            if symbol != 'date':  # 排除时间戳字段
-                btc_pairs.append(f'BTC-{symbol}')
-
-        # 提取基础货币（不包含计价货币）
-        krw_base_currencies = {pair.split('-')[1] for pair in krw_pairs}
-        btc_base_currencies = {pair.split('-')[1] for pair in btc_pairs}
-
-        # 计算仅存在于KRW市场的交易对
-        only_krw = [f'KRW-{coin}' for coin in krw_base_currencies - btc_base_currencies]
-
-        # 计算仅存在于BTC市场的交易对
-        only_btc = [f'BTC-{coin}' for coin in btc_base_currencies - krw_base_currencies]
-
-        # 计算同时存在于两个市场的交易对
-        both_markets = [f'KRW-{coin}, BTC-{coin}' for coin in krw_base_currencies & btc_base_currencies]
-
-        return {
-            'KRW_pairs': krw_pairs,
-            'BTC_pairs': btc_pairs,
-            'only_KRW': only_krw,
-            'only_BTC': only_btc,
-            'both_markets': both_markets
-        }
+        # 获取KRW和BTC市场交易对
+        krw_currencies = [pair.base for pair in bithumb.pairs('KRW')]
+        btc_currencies = [pair.base for pair in bithumb.pairs('BTC')]
+
+        return compare_markets(krw_currencies, btc_currencies)
 
     except Exception as e:
         print(f"获取数据时出错: {e}")
         return None
 
 
-def save_to_excel(data):
-    """将结果保存到Excel文件的不同工作表"""
+def compare_markets(krw_currencies, btc_currencies):
+    """比较KRW和BTC市场的币种，返回各工作表的交易对列表"""
+    # 提取KRW市场交易对列表
+    krw_pairs = [f'KRW-{symbol}' for symbol in krw_currencies]
+
+    # 提取BTC市场交易对列表
+    btc_pairs = [f'BTC-{symbol}' for symbol in btc_currencies]
+
+    # 提取基础货币（不包含计价货币）
+    krw_base_currencies = {pair.split('-')[1] for pair in krw_pairs}
+    btc_base_currencies = {pair.split('-')[1] for pair in btc_pairs}
+
+    # 计算仅存在于KRW市场的交易对
+    only_krw = [f'KRW-{coin}' for coin in krw_base_currencies - btc_base_currencies]
+
+    # 计算仅存在于BTC市场的交易对
+    only_btc = [f'BTC-{coin}' for coin in btc_base_currencies - krw_base_currencies]
+
+    # 计算同时存在于两个市场的交易对
+    both_markets = [f'KRW-{coin}, BTC-{coin}' for coin in krw_base_currencies & btc_base_currencies]
+
+    return {
+        'KRW_pairs': krw_pairs,
+        'BTC_pairs': btc_pairs,
+        'only_KRW': only_krw,
+        'only_BTC': only_btc,
+        'both_markets': both_markets
+    }
+
+
+def record_history(data):
+    """把本次KRW/BTC交易对写入上币历史"""
+    with ListingHistory() as history:
+        history.record('bithumb', [tuple(pair.split('-', 1)) for pair in data['KRW_pairs'] + data['BTC_pairs']])
+
+
+def save_to_excel(data, filename=None):
+    """将结果保存到Excel文件的不同工作表，filename默认按当前时间生成"""
     if not data:
         print("没有数据可保存")
         return
 
-    # 创建输出目录
-    output_dir = 'output'
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    if filename is None:
+        # 创建输出目录
+        output_dir = 'output'
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
 
-    # 生成带时间戳的文件名
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = os.path.join(output_dir, f'bithumb_market_comparison_{timestamp}.xlsx')
+        # 生成带时间戳的文件名
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = os.path.join(output_dir, f'bithumb_market_comparison_{timestamp}.xlsx')
 
-    # 创建Excel写入器
-    with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-        # 保存各个市场的交易对
+    # 创建Excel写入器（常量内存）
+    with ReportWriter(filename) as writer:
+        # 保存各个市场的交易对，列宽按内容设置
         for sheet_name, pairs in data.items():
-            df = pd.DataFrame(pairs, columns=[sheet_name])
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-            # 调整列宽
-            worksheet = writer.sheets[sheet_name]
-            for i, col in enumerate(df.columns):
-                max_len = max(df[col].astype(str).apply(len).max(), len(col)) + 2
-                worksheet.column_dimensions[chr(65 + i)].width = max_len
+            writer.write_values(sheet_name, sheet_name, pairs, fit_columns=True)
 
     print(f"结果已保存到: {filename}")
+    return filename
 
 
 def print_summary(data):
@@ -102,10 +102,16 @@ def print_summary(data):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bithumb KRW/BTC市场交易对比较")
+    parser.add_argument('--refresh', action='store_true', help="忽略本地缓存，强制重新获取交易所数据")
+    args = parser.parse_args()
+    response_cache.set_refresh(args.refresh)
+
     print("正在获取Bithumb交易所的交易对数据...")
     market_data = fetch_bithumb_markets()
 
     if market_data:
+        record_history(market_data)
         print_summary(market_data)
         save_to_excel(market_data)
         print("\n分析完成！")
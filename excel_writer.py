@@ -0,0 +1,67 @@
+"""以常量内存写出Excel报表
+
+基于xlsxwriter的constant_memory模式：每个工作表按行顺序直接写入临时文件，
+写完即释放，不会把所有工作表保存在内存中直到关闭。
+列宽按列向量化计算，表头样式在整个工作簿中共用一个格式对象。
+xlsxwriter在创建写入器时才导入，只导入本模块不会加载它。
+"""
+
+# 报表表头样式：加粗、顶端对齐、自动换行、细边框、浅绿底色
+HEADER_FORMAT = {'bold': True, 'valign': 'top', 'text_wrap': True, 'border': 1, 'fg_color': '#D7E4BC'}
+# 普通表头样式，与pandas.to_excel默认的表头一致
+PLAIN_HEADER_FORMAT = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
+
+
+def column_widths(df):
+    """返回各列宽度：内容与表头的最大字符数加2（缺失值按0计）"""
+    widths = []
+    for col in df.columns:
+        width = len(str(col))
+        if not df.empty:
+            width = max(width, int(df[col].astype(str).str.len().fillna(0).max()))
+        widths.append(width + 2)
+    return widths
+
+
+class ReportWriter:
+    """常量内存的Excel写入器，用法与pd.ExcelWriter类似：with ReportWriter(filename) as writer"""
+
+    def __init__(self, filename):
+        import xlsxwriter
+        self.filename = filename
+        self.workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+        self.header_format = self.workbook.add_format(HEADER_FORMAT)
+        self.plain_header_format = self.workbook.add_format(PLAIN_HEADER_FORMAT)
+
+    def write_sheet(self, sheet_name, df, styled=False, fit_columns=False):
+        """把DataFrame写为一个工作表
+
+        styled为True时表头使用报表样式（空表仍使用普通样式），fit_columns为True时按内容设置列宽。
+        """
+        worksheet = self.workbook.add_worksheet(sheet_name)
+        if fit_columns:
+            for i, width in enumerate(column_widths(df)):
+                worksheet.set_column(i, i, width)
+
+        header_format = self.header_format if styled and not df.empty else self.plain_header_format
+        worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+
+        # 缺失值写为空单元格
+        values = df.astype(object).where(df.notna(), None)
+        for row_num, row in enumerate(values.itertuples(index=False, name=None), start=1):
+            worksheet.write_row(row_num, 0, row)
+        return worksheet
+
+    def write_values(self, sheet_name, column, values, fit_columns=False):
+        """把一列值（如币种集合）写为一个工作表"""
+        import pandas as pd
+        return self.write_sheet(sheet_name, pd.DataFrame(values, columns=[column]), fit_columns=fit_columns)
+
+    def close(self):
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,261 @@
+"""交易所适配器注册表及并发调度
+
+每个适配器负责一个交易所：请求接口并返回统一格式的交易对列表[(报价货币, 基础货币), ...]。
+新增交易所只需定义一个ExchangeAdapter子类并用@register注册；报表需要的更完整的记录
+（币安的精度和上币日期、Upbit的名称和市场警告、Bithumb各报价市场）由对应适配器的其他方法提供。
+fetch_all为每个交易所分配一个线程并发获取，请求速率由rate_scheduler按各交易所的预算统一控制，
+所以整个阶段的耗时取决于最慢的交易所，而不是交易所数量。
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import Future, wait
+from datetime import datetime, timedelta
+
+import http_client
+import response_cache
+import stage_metrics
+import binance_stream
+import exchange_schemas
+import market_records
+from market_records import BinancePair, BithumbPair
+
+ADAPTERS = {}
+
+
+def register(cls):
+    """注册适配器类，名称取cls.name"""
+    ADAPTERS[cls.name] = cls
+    return cls
+
+
+class ExchangeAdapter:
+    """交易所适配器基类"""
+
+    name = None
+    deadline = 12  # 获取阶段的超时时间（秒）
+
+    def get(self, url, params=None):
+        """发送请求（经过本地缓存），请求速率由rate_scheduler按交易所预算控制"""
+        response = response_cache.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        return response
+
+    def fetch_markets(self):
+        """返回[(报价货币, 基础货币), ...]"""
+        raise NotImplementedError
+
+    def first_trading_day(self, quote, base):
+        """返回交易对最早一根日K线的日期(YYYY-MM-DD)，没有K线时返回None"""
+        raise NotImplementedError
+
+
+@register
+class BinanceAdapter(ExchangeAdapter):
+    name = 'binance'
+    deadline = 20
+
+    exchange_info_url = "https://api.binance.com/api/v3/exchangeInfo"
+
+    def fetch_markets(self):
+        response = self.get(self.exchange_info_url)
+        return exchange_schemas.decode_binance_trading_markets(response.content)
+
+    def usdt_pairs(self):
+        """返回USDT现货交易对记录[BinancePair, ...]，包含精度、最小数量和上币日期"""
+        # exchangeInfo体积大且很少变化：边下载边解析，并缓存解析后的交易对行
+        rows = response_cache.get_derived(self.exchange_info_url, binance_stream.parse_usdt_pairs, 'usdt_pair_rows',
+                                          timeout=10, stream=True)
+        with stage_metrics.stage(self.name, stage_metrics.PARSE) as stage:
+            return stage.set_records(market_records.from_rows(BinancePair, rows))
+
+
+@register
+class UpbitAdapter(ExchangeAdapter):
+    name = 'upbit'
+
+    def market_details(self):
+        """返回全部市场[{'market', 'korean_name', 'english_name', 'market_warning'}, ...]"""
+        response = self.get("https://api.upbit.com/v1/market/all")
+        with stage_metrics.stage(self.name, stage_metrics.PARSE) as stage:
+            return stage.set_records(exchange_schemas.decode_upbit_markets(response.content))
+
+    def fetch_markets(self):
+        return [tuple(market['market'].split('-', 1)) for market in self.market_details()]
+
+    def first_trading_day(self, quote, base):
+        market = f"{quote}-{base}"
+        # 月K线每次最多200根，足以覆盖全部历史，最后一根为上币当月
+        response = self.get("https://api.upbit.com/v1/candles/months", params={'market': market, 'count': 200})
+        months = exchange_schemas.decode_upbit_candle_dates(response.content)
+        if not months:
+            return None
+        # 上币当月之后往前200根日K线一定覆盖上币日，最后一根即首个交易日
+        to = datetime.strptime(months[-1], '%Y-%m-%d') + timedelta(days=32)
+        response = self.get("https://api.upbit.com/v1/candles/days",
+                            params={'market': market, 'count': 200, 'to': to.strftime('%Y-%m-%dT00:00:00+09:00')})
+        days = exchange_schemas.decode_upbit_candle_dates(response.content)
+        return days[-1] if days else months[-1]
+
+
+@register
+class BithumbAdapter(ExchangeAdapter):
+    name = 'bithumb'
+    quotes = ('KRW', 'BTC')
+
+    def pairs(self, quote='KRW'):
+        """返回指定报价货币的交易对记录[BithumbPair, ...]，保持接口返回的顺序"""
+        response = self.get(f"https://api.bithumb.com/public/ticker/ALL_{quote}")
+        # 只解码币种代码，跳过各币种的行情统计
+        with stage_metrics.stage(f'{self.name}_{quote.lower()}', stage_metrics.PARSE) as stage:
+            currencies = exchange_schemas.decode_bithumb_currencies(response.content)
+            return stage.set_records([BithumbPair(quote, currency) for currency in currencies])
+
+    def fetch_markets(self):
+        return [(pair.quote, pair.base) for quote in self.quotes for pair in self.pairs(quote)]
+
+    def first_trading_day(self, quote, base):
+        response = self.get(f"https://api.bithumb.com/public/candlestick/{base}_{quote}/24h")
+        return exchange_schemas.decode_bithumb_first_candle_date(response.content)
+
+
+@register
+class OkxAdapter(ExchangeAdapter):
+    name = 'okx'
+
+    def fetch_markets(self):
+        response = self.get("https://www.okx.com/api/v5/public/instruments", params={'instType': 'SPOT'})
+        return exchange_schemas.decode_okx_spot_markets(response.content)
+
+
+@register
+class BybitAdapter(ExchangeAdapter):
+    name = 'bybit'
+
+    def fetch_markets(self):
+        markets = []
+        params = {'category': 'spot'}
+        while True:
+            response = self.get("https://api.bybit.com/v5/market/instruments-info", params=params)
+            page, cursor = exchange_schemas.decode_bybit_spot_markets(response.content)
+            markets += page
+            if not cursor:
+                return markets
+            params = {'category': 'spot', 'cursor': cursor}
+
+
+@register
+class CoinoneAdapter(ExchangeAdapter):
+    name = 'coinone'
+
+    def fetch_markets(self):
+        response = self.get("https://api.coinone.co.kr/public/v2/markets/KRW")
+        return exchange_schemas.decode_coinone_markets(response.content)
+
+
+@register
+class KorbitAdapter(ExchangeAdapter):
+    name = 'korbit'
+
+    def fetch_markets(self):
+        response = self.get("https://api.korbit.co.kr/v1/ticker/detailed/all")
+        return exchange_schemas.decode_korbit_markets(response.content)
+
+
+def _in_daemon_thread(func, *args):
+    """在守护线程中运行func，返回Future
+
+    线程池的工作线程会在进程退出时被等待，卡住的交易所会让进程在重试和超时全部用完前无法退出；
+    守护线程在进程退出时直接结束，还没完成的后台获取被放弃。
+    """
+    future = Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=f"fetch-{args[0]}", daemon=True).start()
+    return future
+
+
+def run_concurrently(fetchers, deadlines, timings=None):
+    """并发执行各获取函数，返回{名称: 结果}
+
+    fetchers为{名称: (获取函数, 失败时结果的构造函数)}，deadlines为{名称: 超时秒数}。
+    获取失败或超时的交易所使用空结果，耗时记录到timings中，每个交易所的获取另外记为一个fetch阶段。
+    获取函数只返回结果，不修改共享状态：超时的线程在后台继续运行，它稍后返回的结果和耗时都会被丢弃。
+    获取在守护线程中运行，进程退出时不等待仍在后台运行的获取。
+    """
+    timings = {} if timings is None else timings
+
+    def timed(name, func):
+        start = time.perf_counter()
+        with stage_metrics.stage(name, stage_metrics.FETCH) as stage:
+            result = stage.set_records(func())
+        return result, time.perf_counter() - start
+
+    stage_start = time.perf_counter()
+    # 不等待超时的线程结束，避免单个交易所拖慢整个阶段
+    futures = {name: _in_daemon_thread(timed, name, func) for name, (func, _) in fetchers.items()}
+
+    results = {}
+    for name, future in futures.items():
+        _, empty = fetchers[name]
+        remaining = deadlines[name] - (time.perf_counter() - stage_start)
+        done, _ = wait([future], timeout=max(remaining, 0))
+        if not done:
+            print(f"获取{name}数据超时（{deadlines[name]}秒），按获取失败处理")
+            timings[name] = deadlines[name]
+            results[name] = empty()
+            continue
+        try:
+            results[name], timings[name] = future.result()
+        except Exception as e:
+            timings[name] = time.perf_counter() - stage_start
+            print(f"获取{name}数据失败: {e}")
+            results[name] = empty()
+
+    for name in fetchers:
+        print(f"{name} 获取耗时: {timings[name]:.2f} 秒")
+    print(f"数据获取阶段总耗时: {time.perf_counter() - stage_start:.2f} 秒")
+    return results
+
+
+def fetch_all(names=None, timings=None):
+    """并发获取已注册交易所（或names指定的交易所）的交易对，返回{名称: [(报价货币, 基础货币), ...]}"""
+    adapters = [ADAPTERS[name]() for name in (names or ADAPTERS)]
+    fetchers = {adapter.name: (adapter.fetch_markets, list) for adapter in adapters}
+    deadlines = {adapter.name: adapter.deadline for adapter in adapters}
+    return run_concurrently(fetchers, deadlines, timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发获取各交易所的交易对列表")
+    parser.add_argument('--venues', nargs='+', choices=sorted(ADAPTERS), help="只获取指定交易所，默认全部")
+    parser.add_argument('--refresh', action='store_true', help="忽略本地缓存，强制重新获取交易所数据")
+    args = parser.parse_args()
+    response_cache.set_refresh(args.refresh)
+
+    results = fetch_all(args.venues)
+    # 获取完成后才导入pandas，不拖慢第一个请求
+    import pandas as pd
+    output_dir = "output"
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = os.path.join(output_dir, f"Exchange_Markets_{timestamp}.xlsx")
+    with pd.ExcelWriter(filename) as writer:
+        for name, markets in results.items():
+            df = pd.DataFrame(sorted(markets), columns=['Quote', 'Base'])
+            df.insert(0, 'Market', df['Quote'] + '-' + df['Base'])
+            df.to_excel(writer, sheet_name=name, index=False)
+            print(f"{name}: {len(df)} 个交易对")
+    http_client.close_all()
+    print(f"\n数据已保存到: {filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""交易所接口返回数据的类型化解码
+
+安装了msgspec时按下面定义的结构解码，只构建需要读取的字段，
+其余字段（如Bithumb行情统计、币安rateLimits/permissions等）在解码时直接跳过；
+未安装时退回到orjson（或标准库json）解码。
+"""
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+HAS_MSGSPEC = msgspec is not None
+
+# 韩国交易所的K线日期按韩国时间划分
+KST = timezone(timedelta(hours=9))
+
+
+if HAS_MSGSPEC:
+    class UpbitMarket(msgspec.Struct):
+        """Upbit market/all 中的一个交易对"""
+        market: str
+        korean_name: str = ''
+        english_name: str = ''
+        market_warning: Optional[str] = None
+
+    class BithumbTickers(msgspec.Struct):
+        """Bithumb ticker/ALL_xxx 响应，行情统计保持为未解码的原始字节"""
+        status: str = ''
+        data: Dict[str, msgspec.Raw] = msgspec.field(default_factory=dict)
+
+    class BinanceFilter(msgspec.Struct):
+        """币安交易对的过滤器，只保留报表需要的字段"""
+        filterType: str
+        tickSize: Optional[str] = None
+        minQty: Optional[str] = None
+        stepSize: Optional[str] = None
+
+    class BinanceSymbol(msgspec.Struct):
+        """币安exchangeInfo中的一个交易对"""
+        symbol: str
+        baseAsset: str
+        quoteAsset: str
+        status: str
+        isSpotTradingAllowed: bool = False
+        filters: List[BinanceFilter] = msgspec.field(default_factory=list)
+        onboardDate: Optional[int] = None
+
+    class BinanceExchangeInfo(msgspec.Struct):
+        """币安exchangeInfo响应，只解码symbols"""
+        symbols: List[BinanceSymbol] = msgspec.field(default_factory=list)
+
+    class BinanceSymbolStatus(msgspec.Struct):
+        """只解码交易对状态，用于监控上下架"""
+        baseAsset: str
+        quoteAsset: str
+        status: str
+
+    class BinanceSymbolStatuses(msgspec.Struct):
+        symbols: List[BinanceSymbolStatus] = msgspec.field(default_factory=list)
+
+    class OkxInstrument(msgspec.Struct):
+        """OKX public/instruments 中的一个现货交易对"""
+        baseCcy: str
+        quoteCcy: str
+        state: str = ''
+
+    class OkxInstruments(msgspec.Struct):
+        data: List[OkxInstrument] = msgspec.field(default_factory=list)
+
+    class BybitInstrument(msgspec.Struct):
+        """Bybit market/instruments-info 中的一个现货交易对"""
+        baseCoin: str
+        quoteCoin: str
+        status: str = ''
+
+    class BybitResult(msgspec.Struct):
+        list: List[BybitInstrument] = msgspec.field(default_factory=list)
+        nextPageCursor: str = ''
+
+    class BybitInstruments(msgspec.Struct):
+        result: BybitResult = msgspec.field(default_factory=BybitResult)
+
+    class CoinoneMarket(msgspec.Struct):
+        """Coinone markets 中的一个交易对"""
+        quote_currency: str
+        target_currency: str
+
+    class CoinoneMarkets(msgspec.Struct):
+        markets: List[CoinoneMarket] = msgspec.field(default_factory=list)
+
+    class UpbitCandle(msgspec.Struct):
+        """Upbit candles 中的一根K线，只保留KST日期时间"""
+        candle_date_time_kst: str
+
+    class BithumbCandles(msgspec.Struct):
+        """Bithumb candlestick 响应，每根K线保持为未解码的原始字节"""
+        status: str = ''
+        data: List[msgspec.Raw] = msgspec.field(default_factory=list)
+
+    _upbit_decoder = msgspec.json.Decoder(List[UpbitMarket])
+    _upbit_candle_decoder = msgspec.json.Decoder(List[UpbitCandle])
+    _bithumb_candle_decoder = msgspec.json.Decoder(BithumbCandles)
+    _bithumb_decoder = msgspec.json.Decoder(BithumbTickers)
+    _binance_decoder = msgspec.json.Decoder(BinanceExchangeInfo)
+    _binance_status_decoder = msgspec.json.Decoder(BinanceSymbolStatuses)
+    _okx_decoder = msgspec.json.Decoder(OkxInstruments)
+    _bybit_decoder = msgspec.json.Decoder(BybitInstruments)
+    _coinone_decoder = msgspec.json.Decoder(CoinoneMarkets)
+    _korbit_decoder = msgspec.json.Decoder(Dict[str, msgspec.Raw])
+
+
+def decode_upbit_markets(content):
+    """解码Upbit market/all，返回与原始JSON字段一致的字典列表"""
+    if not HAS_MSGSPEC:
+        return _loads(content)
+
+    markets = []
+    for record in _upbit_decoder.decode(content):
+        market = {
+            'market': record.market,
+            'korean_name': record.korean_name,
+            'english_name': record.english_name,
+        }
+        if record.market_warning is not None:
+            market['market_warning'] = record.market_warning
+        markets.append(market)
+    return markets
+
+
+def decode_bithumb_currencies(content):
+    """解码Bithumb ticker/ALL_xxx，返回币种列表（不含date字段）"""
+    if HAS_MSGSPEC:
+        data = _bithumb_decoder.decode(content).data
+    else:
+        data = _loads(content).get('data', {})
+    return [currency for currency in data if currency != 'date']
+
+
+def decode_binance_usdt_pairs(content):
+    """解码币安exchangeInfo并返回USDT现货交易对报表行（列顺序见market_records，需要msgspec）"""
+    usdt_pairs = []
+    for symbol in _binance_decoder.decode(content).symbols:
+        if not (symbol.quoteAsset == 'USDT'
+                and symbol.status == 'TRADING'
+                and symbol.isSpotTradingAllowed):
+            continue
+
+        price_filter = lot_size_filter = None
+        for f in symbol.filters:
+            if f.filterType == 'PRICE_FILTER' and price_filter is None:
+                price_filter = f
+            elif f.filterType == 'LOT_SIZE' and lot_size_filter is None:
+                lot_size_filter = f
+
+        usdt_pairs.append((
+            symbol.symbol,
+            symbol.baseAsset,
+            symbol.quoteAsset,
+            _field_or_na(price_filter, 'tickSize'),
+            _field_or_na(lot_size_filter, 'minQty'),
+            _field_or_na(lot_size_filter, 'stepSize'),
+            datetime.fromtimestamp(symbol.onboardDate / 1000).strftime('%Y-%m-%d')
+            if symbol.onboardDate is not None else 'N/A'
+        ))
+    return usdt_pairs
+
+
+def _field_or_na(record, name):
+    value = getattr(record, name, None) if record is not None else None
+    return 'N/A' if value is None else value
+
+
+def decode_binance_trading_markets(content):
+    """解码币安exchangeInfo，返回所有TRADING状态交易对的(报价货币, 基础货币)"""
+    if HAS_MSGSPEC:
+        return [(s.quoteAsset, s.baseAsset) for s in _binance_status_decoder.decode(content).symbols
+                if s.status == 'TRADING']
+    return [(s['quoteAsset'], s['baseAsset']) for s in _loads(content)['symbols'] if s['status'] == 'TRADING']
+
+
+def decode_okx_spot_markets(content):
+    """解码OKX现货交易对，返回live状态交易对的(报价货币, 基础货币)"""
+    if HAS_MSGSPEC:
+        return [(i.quoteCcy, i.baseCcy) for i in _okx_decoder.decode(content).data if i.state == 'live']
+    return [(i['quoteCcy'], i['baseCcy']) for i in _loads(content).get('data', []) if i.get('state') == 'live']
+
+
+def decode_bybit_spot_markets(content):
+    """解码Bybit现货交易对，返回(Trading状态交易对的(报价货币, 基础货币)列表, 下一页游标)"""
+    if HAS_MSGSPEC:
+        result = _bybit_decoder.decode(content).result
+        return ([(i.quoteCoin, i.baseCoin) for i in result.list if i.status == 'Trading'],
+                result.nextPageCursor)
+    result = _loads(content).get('result', {})
+    return ([(i['quoteCoin'], i['baseCoin']) for i in result.get('list', []) if i.get('status') == 'Trading'],
+            result.get('nextPageCursor', ''))
+
+
+def decode_coinone_markets(content):
+    """解码Coinone市场列表，返回(报价货币, 基础货币)"""
+    if HAS_MSGSPEC:
+        return [(m.quote_currency.upper(), m.target_currency.upper())
+                for m in _coinone_decoder.decode(content).markets]
+    return [(m['quote_currency'].upper(), m['target_currency'].upper())
+            for m in _loads(content).get('markets', [])]
+
+
+def decode_korbit_markets(content):
+    """解码Korbit全部行情（键为btc_krw格式），返回(报价货币, 基础货币)，跳过行情内容"""
+    pairs = _korbit_decoder.decode(content) if HAS_MSGSPEC else _loads(content)
+    markets = []
+    for pair in pairs:
+        base, _, quote = pair.partition('_')
+        if quote:
+            markets.append((quote.upper(), base.upper()))
+    return markets
+
+
+def decode_upbit_candle_dates(content):
+    """解码Upbit K线，返回各K线的KST日期(YYYY-MM-DD)列表（接口按时间倒序返回）"""
+    if HAS_MSGSPEC:
+        return [candle.candle_date_time_kst[:10] for candle in _upbit_candle_decoder.decode(content)]
+    return [candle['candle_date_time_kst'][:10] for candle in _loads(content)]
+
+
+def decode_bithumb_first_candle_date(content):
+    """解码Bithumb K线，返回最早一根K线的KST日期(YYYY-MM-DD)，没有K线时返回None
+
+    K线按时间正序返回，只解码第一根。
+    """
+    if HAS_MSGSPEC:
+        candles = _bithumb_candle_decoder.decode(content).data
+        first = _loads(bytes(candles[0])) if candles else None
+    else:
+        candles = _loads(content).get('data', [])
+        first = candles[0] if candles else None
+    if first is None:
+        return None
+    return datetime.fromtimestamp(int(first[0]) / 1000, KST).strftime('%Y-%m-%d')
@@ -0,0 +1,361 @@
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import rate_scheduler
+import stage_metrics
+
+# 默认超时：(连接超时, 读取超时)
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0', 'accept': 'application/json'}
+
+# 重试设置：瞬时错误最多重试次数及指数退避基数（秒）
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 每个主机的连接池大小
+POOL_SIZE = 10
+
+# 镜像主机：请求主机在延迟分位数内没有响应时向镜像发送对冲请求，先返回的响应生效，失败时依次切换
+MIRRORS = {
+    'api.binance.com': ['api1.binance.com', 'api2.binance.com', 'api3.binance.com', 'api4.binance.com',
+                        'data-api.binance.vision'],
+}
+# 对冲等待时间取该主机延迟的这一分位数，样本不足HEDGE_MIN_SAMPLES个时使用默认值
+HEDGE_PERCENTILE = 0.9
+HEDGE_DEFAULT_DELAY = 1.0
+HEDGE_MIN_DELAY = 0.05
+HEDGE_MIN_SAMPLES = 5
+# 每个主机保留的延迟样本数，样本保存在本地文件中供下次运行选择镜像
+LATENCY_SAMPLES = 50
+LATENCY_FILE = os.path.join('.cache', 'host_latency.json')
+# 每积累多少个新样本写一次延迟文件，其余在进程退出时写入
+LATENCY_SAVE_EVERY = 20
+
+# 将所有交易所请求转发到本地替身服务器，例如 http://127.0.0.1:8765（见replay_transport.py）
+API_BASE_OVERRIDE = os.environ.get('EXCHANGE_API_BASE')
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+# 自定义传输层（录制/回放），为None时使用真实网络连接
+_adapter_factory = None
+# 自定义传输层的请求是否经过交易所速率预算（回放不访问交易所，不需要限速）
+_adapter_throttled = True
+_transport_from_env = False
+_transport_lock = threading.Lock()
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def set_adapter_factory(factory, throttle=True):
+    """设置创建传输层Adapter的工厂函数（None恢复真实网络），已有连接全部关闭
+
+    throttle为False时请求不经过rate_scheduler的交易所预算（用于回放）。
+    """
+    global _adapter_factory, _adapter_throttled
+    close_all()
+    _adapter_factory = factory
+    _adapter_throttled = throttle or factory is None
+
+
+def _install_transport_from_env():
+    """按环境变量EXCHANGE_TRANSPORT=record:目录 或 replay:目录 启用录制/回放"""
+    global _transport_from_env
+    if _transport_from_env:
+        return
+    with _transport_lock:
+        if _transport_from_env:
+            return
+        spec = os.environ.get('EXCHANGE_TRANSPORT')
+        if spec:
+            import replay_transport
+            replay_transport.install(spec)
+        _transport_from_env = True
+
+
+def _throttled():
+    """请求是否到达真实交易所：回放或转发到本地替身服务器时不限速，也不按响应头调整预算"""
+    _install_transport_from_env()
+    return _adapter_throttled and not API_BASE_OVERRIDE
+
+
+def _route(url, headers=None):
+    """启用本地替身服务器时改写请求地址，原主机名放在X-Forwarded-Host中"""
+    if not API_BASE_OVERRIDE:
+        return url, headers
+    parts = urlsplit(url)
+    headers = dict(headers or {})
+    headers['X-Forwarded-Host'] = parts.netloc
+    query = f"?{parts.query}" if parts.query else ''
+    return f"{API_BASE_OVERRIDE.rstrip('/')}{parts.path}{query}", headers
+
+
+def get_session(url):
+    """获取指定主机共享的Session（每个主机一个连接池，保持长连接）"""
+    _install_transport_from_env()
+    key = _host_key(url)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                if _adapter_factory is not None:
+                    adapter = _adapter_factory()
+                else:
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+                session.mount(key, adapter)
+                _sessions[key] = session
+    return session
+
+
+def _backoff_delay(attempt, response=None):
+    """计算带抖动的指数退避时间，优先使用服务端的Retry-After"""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(int(retry_after), BACKOFF_MAX)
+    delay = min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX)
+    return random.uniform(0, delay)
+
+
+class LatencyStats:
+    """各主机最近的请求延迟（秒），失败按读取超时计"""
+
+    def __init__(self, path=LATENCY_FILE):
+        self.path = path
+        self.samples = None
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def _load(self):
+        if self.samples is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            self.samples = {host: deque(values, maxlen=LATENCY_SAMPLES) for host, values in data.items()}
+        return self.samples
+
+    def record(self, host, elapsed):
+        with self._lock:
+            self._load().setdefault(host, deque(maxlen=LATENCY_SAMPLES)).append(round(elapsed, 4))
+            self._unsaved += 1
+            due = self._unsaved >= LATENCY_SAVE_EVERY
+        if due:
+            self.save()
+
+    def percentile(self, host, q, min_samples=1):
+        """返回主机延迟的q分位数，样本不足时返回None"""
+        with self._lock:
+            values = sorted(self._load().get(host, ()))
+        if not values or len(values) < min_samples:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def save(self):
+        """写入有新样本的延迟数据，同一时间只有一个线程写文件"""
+        with self._save_lock:
+            with self._lock:
+                if not self._unsaved:
+                    return
+                data = {host: list(values) for host, values in self._load().items()}
+                self._unsaved = 0
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                pass
+
+
+latency_stats = LatencyStats()
+atexit.register(latency_stats.save)
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hedge')
+
+
+def _mirror_hosts(url):
+    """返回按延迟中位数排好序的候选主机，没有镜像或使用录制/回放/替身服务器时返回None"""
+    _install_transport_from_env()
+    host = urlsplit(url).netloc
+    if host not in MIRRORS or _adapter_factory is not None or API_BASE_OVERRIDE:
+        return None
+    hosts = [host] + MIRRORS[host]
+
+    def expected(index):
+        # 没有样本的主机按默认延迟估计，相同时保持原顺序（请求主机优先）
+        median = latency_stats.percentile(hosts[index], 0.5)
+        return (HEDGE_DEFAULT_DELAY if median is None else median, index)
+
+    return [hosts[i] for i in sorted(range(len(hosts)), key=expected)]
+
+
+def _hedge_delay(host):
+    delay = latency_stats.percentile(host, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+    return max(HEDGE_MIN_DELAY, HEDGE_DEFAULT_DELAY if delay is None else delay)
+
+
+def _discard(future):
+    """关闭落后的对冲请求返回的响应"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _get_hedged(url, hosts, params, headers, timeout, stream=False, **kwargs):
+    """向候选主机发送对冲请求：当前请求超过延迟分位数未返回时向下一个主机再发一次，
+    失败时立即切换，先返回的成功响应生效，其余请求取消或在返回后关闭"""
+    parts = urlsplit(url)
+    read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+
+    level = rate_scheduler.current_priority()
+    throttled = _throttled()
+
+    def attempt(host):
+        mirror_url = parts._replace(netloc=host).geturl()
+        # 镜像共用请求主机的速率预算，优先级与调用线程一致
+        if throttled:
+            with rate_scheduler.priority(level):
+                rate_scheduler.acquire(url)
+        start = time.perf_counter()
+        try:
+            response = get_session(mirror_url).get(mirror_url, params=params, headers=headers, timeout=timeout,
+                                                   stream=True, **kwargs)
+            if not stream:
+                response.content
+        except requests.exceptions.RequestException:
+            latency_stats.record(host, read_timeout)
+            raise
+        if throttled:
+            rate_scheduler.observe(url, response)
+        latency_stats.record(host, time.perf_counter() - start if response.status_code not in RETRY_STATUS
+                             else read_timeout)
+        return response
+
+    candidates = list(hosts)
+    pending = {}
+    last_response = last_error = None
+
+    def launch():
+        host = candidates.pop(0)
+        pending[_hedge_executor.submit(attempt, host)] = host
+        return host
+
+    current = launch()
+    while pending:
+        done, _ = wait(pending, timeout=_hedge_delay(current) if candidates else None,
+                       return_when=FIRST_COMPLETED)
+        if not done:
+            current = launch()
+            continue
+        for future in done:
+            pending.pop(future)
+            try:
+                response = future.result()
+            except requests.exceptions.RequestException as e:
+                last_error = e
+                continue
+            if response.status_code in RETRY_STATUS:
+                if last_response is not None:
+                    last_response.close()
+                last_response = response
+                continue
+            for other in pending:
+                if not other.cancel():
+                    other.add_done_callback(_discard)
+            pending.clear()
+            if last_response is not None:
+                last_response.close()
+            return response
+        # 失败的请求立即切换到下一个主机
+        if candidates:
+            current = launch()
+
+    if last_response is not None:
+        return last_response
+    raise last_error
+
+
+def get(url, params=None, headers=None, timeout=None, retries=MAX_RETRIES, **kwargs):
+    """发送GET请求：复用连接池，默认超时，按交易所预算限速，瞬时错误按抖动退避重试
+
+    有镜像的主机改为对冲请求，失败时切换镜像而不是退避重试。
+    响应体字节数计入当前线程进行中的阶段（流式响应在读取时由response_cache计入）。
+    """
+    response = _send(url, params, headers, timeout, retries, **kwargs)
+    if not kwargs.get('stream'):
+        stage_metrics.add_bytes(len(response.content))
+    return response
+
+
+def _send(url, params, headers, timeout, retries, **kwargs):
+    hosts = _mirror_hosts(url)
+    if hosts:
+        return _get_hedged(url, hosts, params, headers, timeout or DEFAULT_TIMEOUT, **kwargs)
+
+    venue_url = url
+    url, headers = _route(url, headers)
+    session = get_session(url)
+    timeout = timeout or DEFAULT_TIMEOUT
+    throttled = _throttled()
+    attempt = 0
+    while True:
+        if throttled:
+            rate_scheduler.acquire(venue_url)
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= retries:
+                raise
+            time.sleep(_backoff_delay(attempt))
+        else:
+            if throttled:
+                rate_scheduler.observe(venue_url, response)
+            if response.status_code not in RETRY_STATUS or attempt >= retries:
+                return response
+            delay = _backoff_delay(attempt, response)
+            response.close()
+            time.sleep(delay)
+        attempt += 1
+
+
+def warm_up(urls, timeout=3):
+    """并发预热连接：提前完成DNS解析和TLS握手，失败不影响后续请求"""
+    hosts = sorted({_host_key(url) for url in urls})
+
+    def touch(host):
+        url, headers = _route(host)
+        try:
+            get_session(url).head(url, headers=headers, timeout=timeout).close()
+        except requests.exceptions.RequestException:
+            pass
+
+    if hosts:
+        with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
+            list(executor.map(touch, hosts))
+
+
+def close_all():
+    """关闭所有共享连接"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
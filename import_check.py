@@ -0,0 +1,81 @@
+"""检查各入口脚本的导入耗时，以及是否提前加载了导出用的重型库
+
+获取和分类阶段只需要requests和标准库，pandas/numpy/pyarrow/xlsxwriter/openpyxl
+应当在真正写报表时才导入。每个模块在新的解释器中用 -X importtime 导入，
+加载了重型库或导入耗时超过预算时以非零状态退出，可以放在定时任务或提交前检查中运行。
+
+    python import_check.py
+    python import_check.py --budget-ms 300 report_runner
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# 只在写报表时才应导入的库
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'xlsxwriter', 'openpyxl')
+
+# 获取和分类路径上的入口模块（上币列表脚本本身就是导出DataFrame，不在检查范围内）
+ENTRY_MODULES = [
+    'ba_upbit_bithumb_final',
+    'report_runner',
+    'upbit_krw_usdt_btc_diff',
+    'bithumb_krw_btc_diff',
+    'exchange_adapters',
+    'listing_watcher',
+    'listing_resolver',
+    'listing_backfill',
+    'report_diff',
+]
+
+# 单个模块的默认导入耗时预算（毫秒），包括requests等必需依赖
+DEFAULT_BUDGET_MS = 400
+
+_PROBE = "import sys, json, {module}; print(json.dumps(sorted(m for m in {heavy} if m in sys.modules)))"
+
+
+def _cumulative_ms(importtime_output, module):
+    """从 -X importtime 的输出中取出模块的累计导入耗时（毫秒）"""
+    for line in importtime_output.splitlines():
+        # import time:       self [us] |  cumulative | imported package
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module and not parts[2][1:].startswith(' '):
+            return int(parts[1]) / 1000
+    return None
+
+
+def check_module(module):
+    """在新的解释器中导入模块，返回(累计导入耗时毫秒, 已加载的重型库列表)"""
+    code = _PROBE.format(module=module, heavy=repr(HEAVY_MODULES))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"导入{module}失败:\n{result.stderr.strip().splitlines()[-1]}")
+    return _cumulative_ms(result.stderr, module), json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查入口脚本的导入耗时及重型库的延迟导入")
+    parser.add_argument('modules', nargs='*', default=ENTRY_MODULES, help="要检查的模块，默认全部入口模块")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help="单个模块的导入耗时预算（毫秒）")
+    args = parser.parse_args()
+
+    failures = 0
+    for module in args.modules:
+        elapsed, heavy = check_module(module)
+        problems = []
+        if heavy:
+            problems.append(f"提前加载了 {', '.join(heavy)}")
+        if elapsed is not None and elapsed > args.budget_ms:
+            problems.append(f"超过预算 {args.budget_ms:.0f} ms")
+        failures += bool(problems)
+        status = '; '.join(problems) if problems else 'OK'
+        print(f"{module:<28} {elapsed if elapsed is not None else float('nan'):8.1f} ms  {status}")
+
+    if failures:
+        print(f"\n{failures} 个模块未通过检查")
+        sys.exit(1)
+    print("\n全部模块通过检查")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""各交易所最近一次成功获取的数据（stale-while-revalidate）
+
+每次成功获取后把结果保存为快照。之后获取时，有快照的交易所只等待较短的时间：
+新数据及时返回就使用新数据，否则（超时、失败或返回空结果）立即使用快照，
+新数据在后台继续获取，成功后更新快照供下次使用。这样单个交易所变慢或不可用时，
+既不会拖慢分析，也不会因为空结果把所有币种归到错误的分类中。
+
+后台获取在守护线程中运行，快照由获取函数在拿到结果时直接保存（见revalidating）。
+进程退出时不等待后台获取：报表写完后进程立即退出，还没完成的获取被放弃，快照保持上一次的内容，
+下次运行时重新获取。币安的对冲请求在共享线程池中发送，退出时最多再等待一次请求的超时时间。
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+import exchange_adapters
+
+LAST_GOOD_DIR = os.path.join('.cache', 'last_good')
+
+# 获取状态
+FRESH = 'fresh'  # 本次获取的新数据
+STALE = 'stale'  # 使用上次成功获取的快照
+FAILED = 'failed'  # 获取失败且没有快照
+
+
+def _records(value):
+    """把结果转换为可JSON序列化的记录列表：紧凑记录（market_records）保存为行，其余原样保存"""
+    return [list(record.row()) if hasattr(record, 'row') else record for record in value]
+
+
+class LastGoodStore:
+    """按名称保存最近一次成功获取的结果"""
+
+    def __init__(self, directory=LAST_GOOD_DIR):
+        self.directory = directory
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.json")
+
+    def load(self, name):
+        """返回(记录列表, 保存时间戳)，没有快照时返回(None, None)"""
+        try:
+            with open(self._path(name), 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            return snapshot['records'], snapshot['saved_at']
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+    def save(self, name, value):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'saved_at': time.time(), 'records': _records(value)}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def revalidating(self, name, func):
+        """返回包装后的获取函数：结果非空时更新快照（超时后在后台完成也会更新）"""
+        def fetch():
+            result = func()
+            if len(result):
+                self.save(name, result)
+            return result
+        return fetch
+
+
+def fetch_with_fallback(fetchers, deadlines, fresh_waits, timings=None, store=None):
+    """并发获取各交易所数据，新数据没有及时返回时使用快照
+
+    fetchers与exchange_adapters.run_concurrently相同，失败时结果的构造函数也用于从快照记录还原结果；
+    有快照的交易所最多等待fresh_waits中的秒数。
+    返回(结果, 状态)，状态为{名称: (FRESH/STALE/FAILED, 数据时间或None)}。
+    """
+    store = store or LastGoodStore()
+    snapshots = {name: store.load(name) for name in fetchers}
+    wrapped = {name: (store.revalidating(name, func), empty) for name, (func, empty) in fetchers.items()}
+    waits = {name: min(deadlines[name], fresh_waits.get(name, deadlines[name]))
+             if snapshots[name][0] is not None else deadlines[name] for name in fetchers}
+
+    results = exchange_adapters.run_concurrently(wrapped, waits, timings)
+
+    status = {}
+    for name, result in results.items():
+        if len(result):
+            status[name] = (FRESH, datetime.now())
+            continue
+        records, saved_at = snapshots[name]
+        if records is None:
+            status[name] = (FAILED, None)
+            print(f"{name}数据获取失败且没有可用的快照，相关分类可能不完整")
+            continue
+        _, empty = fetchers[name]
+        results[name] = empty(records)
+        status[name] = (STALE, datetime.fromtimestamp(saved_at))
+        print(f"{name}使用 {status[name][1]:%Y-%m-%d %H:%M:%S} 的快照（{len(records)} 条），新数据在后台继续获取")
+    return results, status
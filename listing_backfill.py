@@ -0,0 +1,147 @@
+"""从output/中已有的报表补录上币历史
+
+扫描输出目录中的历史报表（Excel文件或列式报表目录），用进程池并行解析：
+从文件名取生成时间，从各工作表取交易所的交易对，合并为每个(交易所, 报价货币, 币种)
+的最早/最晚出现时间后一次性写入上币历史，已有记录只会被扩展，不会被覆盖。
+
+    python listing_backfill.py --dir output --workers 8
+"""
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import listing_history
+from listing_history import ListingHistory
+from report_diff import ReportReader
+
+# 报表文件名前缀 -> [(交易所, 报价货币, 工作表, 列名)]
+# 交易所为None时取工作表名；报价货币为None时从"报价货币-币种"格式的值中拆出；列名为None时取币种列
+REPORT_LAYOUTS = {
+    'Crypto_Exchange_Analysis': [
+        ('upbit', 'KRW', 'Upbit_KRW_pairs', None),
+        ('upbit', 'USDT', 'Upbit_USDT_pairs', None),
+        ('upbit', 'BTC', 'Upbit_BTC_pairs', None),
+        # 交易所间的分类互不重叠，币安/Bithumb的全部币种是包含它的各分类之并
+        ('binance', 'USDT', 'All_Exchanges', None),
+        ('binance', 'USDT', 'Only_Binance', None),
+        ('binance', 'USDT', 'Binance_Upbit', None),
+        ('binance', 'USDT', 'Binance_Bithumb', None),
+        ('bithumb', 'KRW', 'All_Exchanges', None),
+        ('bithumb', 'KRW', 'Only_Bithumb', None),
+        ('bithumb', 'KRW', 'Binance_Bithumb', None),
+        ('bithumb', 'KRW', 'Bithumb_Upbit', None),
+    ],
+    'upbit_pairs': [
+        ('upbit', 'KRW', 'KRW_pairs', None),
+        ('upbit', 'USDT', 'USDT_pairs', None),
+        ('upbit', 'BTC', 'BTC_pairs', None),
+    ],
+    'bithumb_market_comparison': [
+        ('bithumb', None, 'KRW_pairs', None),
+        ('bithumb', None, 'BTC_pairs', None),
+    ],
+    # exchange_adapters.py的输出：每个交易所一个工作表
+    'Exchange_Markets': [
+        (None, None, None, 'Market'),
+    ],
+}
+
+REPORT_PATTERN = re.compile(r'^(%s)_(\d{8})_(\d{6})(\.xlsx)?$' % '|'.join(REPORT_LAYOUTS))
+
+
+def find_reports(directory):
+    """返回目录中可以补录的报表[(路径, 报表类型, 生成时间), ...]，按生成时间排序"""
+    reports = []
+    for name in os.listdir(directory):
+        match = REPORT_PATTERN.match(name)
+        path = os.path.join(directory, name)
+        # 列式报表是不带扩展名的目录，分类币种长表由ReportReader自动读取
+        if not match or (match.group(4) is None and not os.path.isdir(path)):
+            continue
+        seen_at = datetime.strptime(match.group(2) + match.group(3), '%Y%m%d%H%M%S')
+        reports.append((path, match.group(1), seen_at.strftime(listing_history.TIME_FORMAT)))
+    return sorted(reports, key=lambda report: report[2])
+
+
+def parse_report(report):
+    """解析一份报表，返回(生成时间, {(交易所, 报价货币, 币种), ...})，在子进程中执行"""
+    path, kind, seen_at = report
+    markets = set()
+    reader = ReportReader(path)
+    try:
+        available = set(reader.sheet_names())
+        # 使用上次快照或获取失败的交易所不代表报表生成时的状态，跳过
+        stale = set(reader.values('Stale_Venues', '交易所')) if 'Stale_Venues' in available else set()
+        for venue, quote, sheet, column in REPORT_LAYOUTS[kind]:
+            if venue in stale:
+                continue
+            sheets = [sheet] if sheet else sorted(available)
+            for sheet_name in sheets:
+                # 早期报表可能没有某些工作表
+                if sheet_name not in available:
+                    continue
+                for value in reader.values(sheet_name, column):
+                    value = str(value)
+                    if quote is None:
+                        market_quote, _, asset = value.partition('-')
+                    else:
+                        market_quote, asset = quote, value
+                    if asset:
+                        markets.add((venue or sheet_name, market_quote, asset))
+    finally:
+        reader.close()
+    return seen_at, markets
+
+
+def build_timeline(results):
+    """把各报表的解析结果合并为{(交易所, 报价货币, 币种): [最早时间, 最晚时间]}"""
+    timeline = {}
+    for seen_at, markets in results:
+        for key in markets:
+            span = timeline.get(key)
+            if span is None:
+                timeline[key] = [seen_at, seen_at]
+            elif seen_at < span[0]:
+                span[0] = seen_at
+            elif seen_at > span[1]:
+                span[1] = seen_at
+    return timeline
+
+
+def backfill(directory, history_path=None, workers=None):
+    """补录目录中的全部报表，返回(报表数, 写入的交易对数)"""
+    reports = find_reports(directory)
+    if not reports:
+        return 0, 0
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for report, result in zip(reports, executor.map(parse_report, reports, chunksize=4)):
+            print(f"已解析 {os.path.basename(report[0])}: {len(result[1])} 个交易对")
+            results.append(result)
+
+    timeline = build_timeline(results)
+    with ListingHistory(history_path) as history:
+        history.merge((venue, quote, asset, first_seen, last_seen)
+                      for (venue, quote, asset), (first_seen, last_seen) in timeline.items())
+    return len(reports), len(timeline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从已有报表补录上币历史")
+    parser.add_argument('--dir', default='output', help="报表所在目录")
+    parser.add_argument('--db', default=listing_history.DEFAULT_PATH, help="历史数据库路径")
+    parser.add_argument('--workers', type=int, default=None, help="解析进程数，默认使用全部CPU核心")
+    args = parser.parse_args()
+
+    report_count, market_count = backfill(args.dir, args.db, args.workers)
+    if not report_count:
+        print(f"{args.dir} 中没有可补录的报表")
+        return
+    print(f"\n已从 {report_count} 份报表补录 {market_count} 个交易对的上币历史到 {args.db}")
+
+
+if __name__ == "__main__":
+    main()
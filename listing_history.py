@@ -0,0 +1,185 @@
+"""交易所上币历史（SQLite）
+
+每次获取交易所数据后写入一次快照：每个(交易所, 报价货币, 币种)一行，
+记录第一次和最后一次出现的时间。重复写入只更新时间范围，补录的旧快照也能把first_seen往前推
+（从已有报表补录见listing_backfill.py）。
+listing_dates表永久保存从K线查出的首个交易日（见listing_resolver.py）；
+unresolved_dates表记录最近一次没有查出日期（没有K线或查询失败）的时间，短时间内不再重复查询。
+
+    python listing_history.py first BTC --venue upbit --quote BTC
+    python listing_history.py recent --hours 24 --venue bithumb
+"""
+import argparse
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+DEFAULT_PATH = os.environ.get('LISTING_HISTORY_DB', os.path.join('output', 'listing_history.sqlite3'))
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    venue TEXT NOT NULL,
+    quote TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    PRIMARY KEY (venue, quote, asset)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_listings_asset ON listings (asset, first_seen);
+CREATE INDEX IF NOT EXISTS idx_listings_first_seen ON listings (first_seen);
+CREATE INDEX IF NOT EXISTS idx_listings_venue_first_seen ON listings (venue, first_seen);
+CREATE TABLE IF NOT EXISTS listing_dates (
+    venue TEXT NOT NULL,
+    quote TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    listed_on TEXT NOT NULL,
+    PRIMARY KEY (venue, quote, asset)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS unresolved_dates (
+    venue TEXT NOT NULL,
+    quote TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    checked_at TEXT NOT NULL,
+    PRIMARY KEY (venue, quote, asset)
+) WITHOUT ROWID;
+"""
+
+UPSERT = """
+INSERT INTO listings (venue, quote, asset, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (venue, quote, asset) DO UPDATE SET
+    first_seen = min(first_seen, excluded.first_seen),
+    last_seen = max(last_seen, excluded.last_seen)
+"""
+
+
+def now():
+    """返回当前时间的字符串形式"""
+    return datetime.now().strftime(TIME_FORMAT)
+
+
+class ListingHistory:
+    """上币历史存储，用法：with ListingHistory() as history"""
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PATH
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def record(self, venue, markets, seen_at=None):
+        """写入一个交易所的快照，markets为[(报价货币, 币种), ...]"""
+        seen_at = seen_at or now()
+        self.merge((venue, quote, asset, seen_at, seen_at) for quote, asset in markets)
+
+    def merge(self, rows):
+        """合并[(交易所, 报价货币, 币种, first_seen, last_seen), ...]，已有记录只扩展时间范围"""
+        with self.conn:
+            self.conn.executemany(UPSERT, rows)
+
+    def first_seen(self, asset, venue=None, quote=None):
+        """返回币种最早出现的时间，没有记录时返回None"""
+        sql = 'SELECT min(first_seen) FROM listings WHERE asset = ?'
+        params = [asset]
+        if venue:
+            sql += ' AND venue = ?'
+            params.append(venue)
+        if quote:
+            sql += ' AND quote = ?'
+            params.append(quote)
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def listed_since(self, since, venue=None, quote=None):
+        """返回since之后首次出现的交易对[(交易所, 报价货币, 币种, first_seen), ...]，按时间排序"""
+        sql = 'SELECT venue, quote, asset, first_seen FROM listings WHERE first_seen >= ?'
+        params = [since]
+        if venue:
+            sql += ' AND venue = ?'
+            params.append(venue)
+        if quote:
+            sql += ' AND quote = ?'
+            params.append(quote)
+        return self.conn.execute(sql + ' ORDER BY first_seen', params).fetchall()
+
+    def listing_dates(self, venues=None):
+        """返回{币种: 最早出现日期YYYY-MM-DD}，venues指定时只看这些交易所
+
+        交易所最早一次快照中已有的币种，first_seen只是开始记录的时间而不是上币时间，
+        这些币种不返回（在任一交易所属于这种情况都不返回），由调用方按未知处理。
+        """
+        sql = ('SELECT l.asset, min(l.first_seen), max(l.first_seen = s.started) FROM listings l '
+               'JOIN (SELECT venue, min(first_seen) AS started FROM listings GROUP BY venue) s '
+               'ON l.venue = s.venue')
+        params = []
+        if venues:
+            sql += f" WHERE l.venue IN ({', '.join('?' * len(venues))})"
+            params = list(venues)
+        rows = self.conn.execute(sql + ' GROUP BY l.asset', params)
+        return {asset: first_seen[:10] for asset, first_seen, from_start in rows if not from_start}
+
+    def resolved_dates(self, venue):
+        """返回已查出的交易对首个交易日{(报价货币, 币种): YYYY-MM-DD}"""
+        rows = self.conn.execute('SELECT quote, asset, listed_on FROM listing_dates WHERE venue = ?', (venue,))
+        return {(quote, asset): listed_on for quote, asset, listed_on in rows}
+
+    def save_resolved(self, venue, dates):
+        """永久保存查出的首个交易日，dates为{(报价货币, 币种): YYYY-MM-DD}"""
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO listing_dates VALUES (?, ?, ?, ?)',
+                                  ((venue, quote, asset, listed_on) for (quote, asset), listed_on in dates.items()))
+            self.conn.executemany('DELETE FROM unresolved_dates WHERE venue = ? AND quote = ? AND asset = ?',
+                                  ((venue, quote, asset) for quote, asset in dates))
+
+    def unresolved_since(self, venue, since):
+        """返回since之后查询过但没有查出日期的交易对{(报价货币, 币种), ...}"""
+        rows = self.conn.execute('SELECT quote, asset FROM unresolved_dates WHERE venue = ? AND checked_at >= ?',
+                                 (venue, since))
+        return set(rows)
+
+    def save_unresolved(self, venue, markets, checked_at=None):
+        """记录没有查出日期的交易对[(报价货币, 币种), ...]及查询时间"""
+        checked_at = checked_at or now()
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO unresolved_dates VALUES (?, ?, ?, ?)',
+                                  ((venue, quote, asset, checked_at) for quote, asset in markets))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询交易所上币历史")
+    parser.add_argument('--db', default=DEFAULT_PATH, help="历史数据库路径")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    first_parser = subparsers.add_parser('first', help="查询币种最早出现的时间")
+    first_parser.add_argument('asset')
+    first_parser.add_argument('--venue')
+    first_parser.add_argument('--quote')
+    recent_parser = subparsers.add_parser('recent', help="列出最近首次出现的交易对")
+    recent_parser.add_argument('--hours', type=float, default=24)
+    recent_parser.add_argument('--venue')
+    recent_parser.add_argument('--quote')
+    args = parser.parse_args()
+
+    with ListingHistory(args.db) as history:
+        if args.command == 'first':
+            first_seen = history.first_seen(args.asset.upper(), args.venue, args.quote)
+            print(first_seen or f"没有 {args.asset} 的记录")
+            return
+
+        since = (datetime.now() - timedelta(hours=args.hours)).strftime(TIME_FORMAT)
+        rows = history.listed_since(since, args.venue, args.quote)
+        for venue, quote, asset, first_seen in rows:
+            print(f"{first_seen} {venue} {quote}-{asset}")
+        print(f"最近 {args.hours:g} 小时共 {len(rows)} 个新交易对")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""从最早一根日K线查出交易对的首个交易日（真实上币日期）
+
+Upbit/Bithumb不提供上币日期。这里并发查询各交易对最早的日K线，
+请求经过交易所适配器，由rate_scheduler按各交易所的预算以低优先级限流；查出的日期永久保存在上币历史中，
+之后只查询新出现的交易对。没有K线或查询失败的交易对也记录下来，UNRESOLVED_TTL_HOURS小时内不再重复查询。
+
+    python listing_resolver.py --venues upbit bithumb
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+import exchange_adapters
+import listing_history
+import rate_scheduler
+import stage_metrics
+from listing_history import ListingHistory
+
+# 并发查询的线程数，实际请求速率由各交易所的速率预算决定
+DEFAULT_WORKERS = 16
+
+# 没有查出日期的交易对在这段时间（小时）内不再查询，之后重试（可能刚上线还没有K线，或者上次查询失败）
+UNRESOLVED_TTL_HOURS = 6
+
+
+def _lookup(adapter, market, stages=()):
+    try:
+        # 批量查询让位于同一进程中的报表获取请求，响应字节计入调用线程的阶段
+        with rate_scheduler.priority(rate_scheduler.LOW), stage_metrics.attached(stages):
+            return adapter.first_trading_day(*market)
+    except (requests.exceptions.RequestException, ValueError, KeyError, IndexError, TypeError) as e:
+        # 查询失败的交易对按没有日期记录，过了UNRESOLVED_TTL_HOURS后重试
+        print(f"查询{adapter.name} {market[0]}-{market[1]}上币日期失败: {e}")
+        return None
+
+
+def resolve(venue, markets, history_path=None, workers=DEFAULT_WORKERS, unresolved_ttl=UNRESOLVED_TTL_HOURS):
+    """返回{(报价货币, 币种): 首个交易日}，只查询历史中还没有日期、最近unresolved_ttl小时内也没有查过的交易对"""
+    adapter = exchange_adapters.ADAPTERS[venue]()
+    markets = list(dict.fromkeys(markets))
+    with ListingHistory(history_path) as history:
+        resolved = history.resolved_dates(venue)
+        since = (datetime.now() - timedelta(hours=unresolved_ttl)).strftime(listing_history.TIME_FORMAT)
+        unresolved = history.unresolved_since(venue, since) if unresolved_ttl > 0 else set()
+        missing = [market for market in markets if market not in resolved and market not in unresolved]
+        if missing:
+            print(f"正在查询{venue} {len(missing)} 个交易对的上币日期...")
+            stages = stage_metrics.active()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                dates = dict(zip(missing, executor.map(lambda market: _lookup(adapter, market, stages), missing)))
+            found = {market: date for market, date in dates.items() if date}
+            history.save_resolved(venue, found)
+            history.save_unresolved(venue, [market for market, date in dates.items() if not date])
+            resolved.update(found)
+    return {market: resolved[market] for market in markets if market in resolved}
+
+
+def asset_dates(market_dates):
+    """把交易对的日期合并为{币种: 各报价货币市场中最早的日期}"""
+    dates = {}
+    for (_, asset), date in market_dates.items():
+        if asset not in dates or date < dates[asset]:
+            dates[asset] = date
+    return dates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询交易对的首个交易日并保存到上币历史")
+    parser.add_argument('--venues', nargs='+', default=['upbit', 'bithumb'], choices=['upbit', 'bithumb'])
+    parser.add_argument('--db', default=listing_history.DEFAULT_PATH, help="历史数据库路径")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="并发查询线程数")
+    parser.add_argument('--unresolved-ttl', type=float, default=UNRESOLVED_TTL_HOURS,
+                        help="没有查出日期的交易对多少小时内不再查询（0为全部重新查询）")
+    args = parser.parse_args()
+
+    for venue in args.venues:
+        markets = exchange_adapters.ADAPTERS[venue]().fetch_markets()
+        dates = resolve(venue, markets, args.db, args.workers, args.unresolved_ttl)
+        print(f"{venue}: {len(dates)}/{len(markets)} 个交易对已有上币日期")
+
+
+if __name__ == "__main__":
+    main()
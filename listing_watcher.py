@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import http_client
+import exchange_schemas
+from snapshot_diff import IncrementalSnapshot
+
+UPBIT_MARKETS_URL = "https://api.upbit.com/v1/market/all"
+BITHUMB_TICKER_URL = "https://api.bithumb.com/public/ticker/ALL_{quote}"
+BINANCE_EXCHANGE_INFO_URL = "https://api.binance.com/api/v3/exchangeInfo"
+
+# 监控请求使用较短的超时，单次失败由下一轮轮询补上
+WATCH_TIMEOUT = (2, 5)
+
+
+def fetch_upbit_markets():
+    """返回Upbit所有交易对代码，如KRW-BTC"""
+    response = http_client.get(UPBIT_MARKETS_URL, timeout=WATCH_TIMEOUT, retries=0)
+    response.raise_for_status()
+    return {market['market'] for market in exchange_schemas.decode_upbit_markets(response.content)}
+
+
+def make_bithumb_fetcher(quote):
+    """返回获取Bithumb指定报价市场交易对代码的函数"""
+    url = BITHUMB_TICKER_URL.format(quote=quote)
+
+    def fetch():
+        response = http_client.get(url, timeout=WATCH_TIMEOUT, retries=0)
+        response.raise_for_status()
+        return {f'{quote}-{currency}' for currency in exchange_schemas.decode_bithumb_currencies(response.content)}
+
+    return fetch
+
+
+def fetch_binance_markets():
+    """返回币安所有TRADING状态交易对代码，统一为报价货币-基础货币格式，如USDT-BTC"""
+    response = http_client.get(BINANCE_EXCHANGE_INFO_URL, timeout=WATCH_TIMEOUT, retries=0)
+    response.raise_for_status()
+    return {f'{quote}-{base}' for quote, base in exchange_schemas.decode_binance_trading_markets(response.content)}
+
+
+# 数据源名称 -> (获取函数, 默认轮询间隔秒数)
+DEFAULT_FEEDS = {
+    'upbit': (fetch_upbit_markets, 1.0),
+    'bithumb_krw': (make_bithumb_fetcher('KRW'), 1.0),
+    'bithumb_btc': (make_bithumb_fetcher('BTC'), 1.0),
+    'binance': (fetch_binance_markets, 5.0),
+}
+
+
+# 数据源 -> (分类引擎中的数据源名称, 报价货币)；upbit按报价货币拆分，单独处理
+FEED_SOURCES = {
+    'bithumb_krw': ('Bithumb_KRW', 'KRW'),
+    'binance': ('Binance_USDT', 'USDT'),
+}
+
+
+class ListingWatcher:
+    """常驻轮询各交易所，交易对出现或消失时立即发出事件
+
+    每个数据源在独立线程中按自己的间隔轮询，内存中只保留上一次的交易对集合，
+    首次获取作为基准不产生事件。交易对变化同时按增量更新派生分类
+    （only_KRW、Binance_Bithumb等），所有数据源都有基准后分类变化也会发出事件。
+    """
+
+    def __init__(self, feeds=None, events_file=None, on_event=None):
+        self.feeds = feeds or DEFAULT_FEEDS
+        self.events_file = events_file
+        self.on_event = on_event
+        self.snapshots = {}
+        self.categories = IncrementalSnapshot()
+        self._categories_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._events_lock = threading.Lock()
+
+    def emit(self, event):
+        """输出事件：打印、追加写入NDJSON文件并调用回调"""
+        if 'category' in event:
+            action = '进入' if event['action'] == 'entered' else '移出'
+            print(f"[{event['detected_at']}] {event['asset']} {action}分类 {event['category']}")
+        else:
+            action = '上线' if event['action'] == 'listed' else '下线'
+            print(f"[{event['detected_at']}] {event['feed']} {action}: {event['market']}")
+        if self.events_file:
+            with self._events_lock:
+                with open(self.events_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(event, ensure_ascii=False) + '\n')
+        if self.on_event:
+            self.on_event(event)
+
+    def poll_once(self, name, fetch):
+        """轮询一次指定数据源，返回本次产生的事件列表"""
+        started = time.time()
+        markets = fetch()
+        detected_at = datetime.now().isoformat(timespec='milliseconds')
+        previous = self.snapshots.get(name)
+        baselines_ready = len(self.snapshots) == len(self.feeds)
+        self.snapshots[name] = markets
+        category_changes = self.update_categories(name, markets)
+        if previous is None:
+            print(f"{name} 基准快照: {len(markets)} 个交易对")
+            return []
+
+        fetch_ms = round((time.time() - started) * 1000, 1)
+        events = [{'detected_at': detected_at, 'feed': name, 'market': market, 'action': 'listed',
+                   'fetch_ms': fetch_ms} for market in sorted(markets - previous)]
+        events += [{'detected_at': detected_at, 'feed': name, 'market': market, 'action': 'delisted',
+                    'fetch_ms': fetch_ms} for market in sorted(previous - markets)]
+        if baselines_ready:
+            for category, (entered, left) in sorted(category_changes.items()):
+                events += [{'detected_at': detected_at, 'feed': name, 'category': category, 'asset': asset,
+                            'action': 'entered'} for asset in sorted(entered)]
+                events += [{'detected_at': detected_at, 'feed': name, 'category': category, 'asset': asset,
+                            'action': 'left'} for asset in sorted(left)]
+        for event in events:
+            self.emit(event)
+        return events
+
+    def update_categories(self, name, markets):
+        """用数据源的最新交易对增量更新派生分类，返回有变化的分类"""
+        with self._categories_lock:
+            if name == 'upbit':
+                return self.categories.update_upbit(markets)
+            if name in FEED_SOURCES:
+                source, quote = FEED_SOURCES[name]
+                prefix = f'{quote}-'
+                return self.categories.update(source, {market[len(prefix):] for market in markets
+                                                       if market.startswith(prefix)})
+        return {}
+
+    def _poll_loop(self, name, fetch, interval):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.poll_once(name, fetch)
+            except Exception as e:
+                print(f"{name} 轮询失败: {e}")
+            self._stop.wait(max(interval - (time.monotonic() - started), 0))
+
+    def start(self, intervals=None):
+        """为每个数据源启动轮询线程，intervals可覆盖默认间隔"""
+        intervals = intervals or {}
+        for name, (fetch, interval) in self.feeds.items():
+            thread = threading.Thread(target=self._poll_loop, name=f"watch-{name}",
+                                      args=(name, fetch, intervals.get(name, interval)), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="交易所新币上线监控")
+    parser.add_argument('--upbit-interval', type=float, default=DEFAULT_FEEDS['upbit'][1], help="Upbit轮询间隔（秒）")
+    parser.add_argument('--bithumb-interval', type=float, default=DEFAULT_FEEDS['bithumb_krw'][1],
+                        help="Bithumb轮询间隔（秒）")
+    parser.add_argument('--binance-interval', type=float, default=DEFAULT_FEEDS['binance'][1],
+                        help="币安轮询间隔（秒）")
+    parser.add_argument('--events-file', default=os.path.join('output', 'listing_events.ndjson'),
+                        help="事件输出文件（NDJSON），为空则只打印")
+    parser.add_argument('--duration', type=float, default=0, help="运行时长（秒），0表示一直运行")
+    args = parser.parse_args()
+
+    if args.events_file:
+        os.makedirs(os.path.dirname(args.events_file) or '.', exist_ok=True)
+
+    print("=== 交易所新币上线监控 ===")
+    http_client.warm_up([UPBIT_MARKETS_URL, BITHUMB_TICKER_URL, BINANCE_EXCHANGE_INFO_URL])
+
+    watcher = ListingWatcher(events_file=args.events_file or None)
+    watcher.start({
+        'upbit': args.upbit_interval,
+        'bithumb_krw': args.bithumb_interval,
+        'bithumb_btc': args.bithumb_interval,
+        'binance': args.binance_interval,
+    })
+    try:
+        if args.duration:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        print("监控已停止")
+
+
+if __name__ == "__main__":
+    main()
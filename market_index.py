@@ -0,0 +1,68 @@
+"""Upbit market/all 快照的一次性索引
+
+每个快照只解析一次交易对代码：按报价货币分组，基础货币预先拆出，
+组内按上币日期排好序。各报表需要的列表都是在索引上按币种集合筛选出的子序列，
+已经有序，不需要再次扫描全部市场、拆分代码或重新排序。
+"""
+from operator import itemgetter
+
+# 没有上币日期的币种排在最后
+UNKNOWN_DATE_KEY = '9999-99-99'
+
+
+def group_bases(markets):
+    """返回{报价货币: 基础货币列表}，保持快照中的原顺序
+
+    只拆分交易对代码，不排序也不需要上币日期，只用到币种集合的分类不必先建立索引。
+    """
+    by_quote = {}
+    for market in markets:
+        quote, base = market['market'].split('-', 1)
+        by_quote.setdefault(quote, []).append(base)
+    return by_quote
+
+
+class MarketIndex:
+    """按报价货币分组、按上币日期排序的Upbit市场索引"""
+
+    def __init__(self, markets, listing_dates=None):
+        """listing_dates为None时按交易对代码排序，否则按上币日期排序（相同日期保持原顺序）"""
+        self.groups = {}  # 报价货币 -> [(基础货币, 交易对)]，保持快照中的原顺序
+        for market in markets:
+            quote, base = market['market'].split('-', 1)
+            self.groups.setdefault(quote, []).append((base, market))
+        self._sort(listing_dates)
+
+    def _sort(self, listing_dates):
+        self.quotes = {}
+        for quote, rows in self.groups.items():
+            if listing_dates is None:
+                keys = [market['market'] for _, market in rows]
+            else:
+                keys = [listing_dates.get(base, UNKNOWN_DATE_KEY) for base, _ in rows]
+            rows = [row for _, row in sorted(zip(keys, rows), key=itemgetter(0))]
+            self.quotes[quote] = ([base for base, _ in rows], [market for _, market in rows])
+
+    def reordered(self, listing_dates=None):
+        """返回按另一份上币日期排序的索引：复用已拆分的分组，不再解析交易对代码"""
+        index = MarketIndex([])
+        index.groups = self.groups
+        index._sort(listing_dates)
+        return index
+
+    def pairs(self, quote):
+        """返回报价货币下的全部交易对（已排序）"""
+        return self.quotes.get(quote, ([], []))[1]
+
+    def bases(self, quote):
+        """返回报价货币下的全部基础货币（与pairs顺序一致）"""
+        return self.quotes.get(quote, ([], []))[0]
+
+    def select(self, quote, assets):
+        """返回报价货币下基础货币属于assets的交易对，保持排序"""
+        bases, markets = self.quotes.get(quote, ([], []))
+        return [market for base, market in zip(bases, markets) if base in assets]
+
+    def bases_by_quote(self):
+        """返回{报价货币: 基础货币列表}"""
+        return {quote: bases for quote, (bases, _) in self.quotes.items()}
@@ -0,0 +1,78 @@
+"""交易对的紧凑记录
+
+获取、分类和比较只需要币种集合，不需要DataFrame：交易对保存为带__slots__的记录，
+币种和报价货币字符串经过sys.intern，各交易所数据中的同一币种共用一个字符串对象。
+DataFrame只在写报表时由to_frame生成；快照和解析结果缓存按行（列表）保存。
+"""
+from sys import intern
+
+# 币安USDT交易对的列，binance_stream/exchange_schemas解析出的行按这个顺序排列
+BINANCE_PAIR_COLUMNS = ('Symbol', 'Base Asset', 'Quote Asset', 'Price Precision', 'Min Qty', 'Qty Precision',
+                        'Listing Date')
+
+
+class BinancePair:
+    """币安USDT现货交易对"""
+    __slots__ = ('symbol', 'base', 'quote', 'price_precision', 'min_qty', 'qty_precision', 'listing_date')
+    COLUMNS = BINANCE_PAIR_COLUMNS
+
+    def __init__(self, symbol, base, quote, price_precision, min_qty, qty_precision, listing_date):
+        self.symbol = symbol
+        self.base = intern(base)
+        self.quote = intern(quote)
+        self.price_precision = price_precision
+        self.min_qty = min_qty
+        self.qty_precision = qty_precision
+        self.listing_date = listing_date
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+    def row(self):
+        return (self.symbol, self.base, self.quote, self.price_precision, self.min_qty, self.qty_precision,
+                self.listing_date)
+
+
+class BithumbPair:
+    """Bithumb交易对，接口只提供币种代码"""
+    __slots__ = ('quote', 'base')
+    COLUMNS = ('Market', 'Currency', 'Korean Name', 'English Name')
+
+    def __init__(self, quote, base):
+        self.quote = intern(quote)
+        self.base = intern(base)
+
+    @property
+    def market(self):
+        return f'{self.quote}-{self.base}'
+
+    @classmethod
+    def from_row(cls, row):
+        quote, _, base = row[0].partition('-')
+        return cls(quote, base)
+
+    def row(self):
+        return (self.market, self.base, '', '')
+
+
+def from_rows(record_type, rows=()):
+    """由行列表还原记录列表，也接受以列名为键的字典（旧版快照）"""
+    records = []
+    for row in rows:
+        if isinstance(row, dict):
+            row = [row[column] for column in record_type.COLUMNS]
+        records.append(record_type.from_row(row))
+    return records
+
+
+def assets(records):
+    """返回记录中的币种集合"""
+    return {record.base for record in records}
+
+
+def to_frame(records, record_type):
+    """把记录列表转换为报表的DataFrame，没有记录时返回只有列名的空DataFrame"""
+    # 只有写报表时才需要pandas
+    import pandas as pd
+    return pd.DataFrame([record.row() for record in records], columns=list(record_type.COLUMNS))
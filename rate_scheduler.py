@@ -0,0 +1,203 @@
+"""按交易所响应头调度请求速率
+
+所有经过http_client的请求在发送前从所属交易所的预算中取得额度。预算按固定时间窗口计数，
+并用交易所返回的实际用量校正：Upbit的Remaining-Req（按接口组每秒计数）、
+币安的X-MBX-USED-WEIGHT-1M（每分钟请求权重）。收到429/418时整个预算暂停到Retry-After之后。
+额度不足时等待的请求按优先级排队，优先级相同的按先后顺序发送。
+
+    with rate_scheduler.priority(rate_scheduler.LOW):
+        ...  # 批量查询，让位于报表获取
+"""
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# 请求优先级：数值越小越先发送
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# 主机 -> 交易所，同一交易所的镜像主机共用预算
+VENUE_HOSTS = {
+    'api.upbit.com': 'upbit',
+    'api.binance.com': 'binance',
+    'api1.binance.com': 'binance',
+    'api2.binance.com': 'binance',
+    'api3.binance.com': 'binance',
+    'api4.binance.com': 'binance',
+    'data-api.binance.vision': 'binance',
+    'api.bithumb.com': 'bithumb',
+    'www.okx.com': 'okx',
+    'api.bybit.com': 'bybit',
+    'api.coinone.co.kr': 'coinone',
+    'api.korbit.co.kr': 'korbit',
+}
+
+# 交易所 -> (每个窗口的额度, 窗口秒数)
+# Upbit按接口组（路径第二段，如market、candles）分别计数；币安按请求权重计数
+VENUE_LIMITS = {
+    'upbit': (10, 1),
+    'binance': (6000, 60),
+    'bithumb': (20, 1),
+    'okx': (10, 1),
+    'bybit': (10, 1),
+    'coinone': (5, 1),
+    'korbit': (5, 1),
+}
+
+# 币安接口的请求权重，未列出的按1计
+BINANCE_WEIGHTS = {
+    '/api/v3/exchangeInfo': 20,
+    '/api/v3/klines': 2,
+    '/api/v3/ticker/24hr': 80,
+}
+
+# 每个窗口只使用额度的这一比例，给同一IP上的其他程序留出余量
+SAFETY = 0.9
+
+_sequence = itertools.count()
+
+
+class Budget:
+    """一个交易所（或接口组）的请求预算：固定窗口内的剩余额度及按优先级排队的等待请求"""
+
+    def __init__(self, limit, window):
+        self.raw_limit = limit
+        self.limit = max(1, int(limit * SAFETY))
+        self.window = window
+        self.remaining = self.limit
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self._waiters = []
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            # 窗口按整秒/整分钟对齐，与交易所的计数窗口一致
+            self.reset_at = (now // self.window + 1) * self.window
+
+    def acquire(self, cost=1, priority=NORMAL):
+        """取得cost个额度，额度不足或被暂停时等待；排在前面的请求先取得额度"""
+        cost = min(cost, self.limit)
+        ticket = (priority, next(_sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.time()
+                    self._refill(now)
+                    timeout = None
+                    if self._waiters[0] == ticket:
+                        if now < self.blocked_until:
+                            timeout = self.blocked_until - now
+                        elif self.remaining < cost:
+                            timeout = self.reset_at - now
+                        else:
+                            self.remaining -= cost
+                            return
+                    self._cond.wait(timeout)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def observe(self, remaining=None, retry_after=None):
+        """用响应头校正预算：remaining为交易所报告的剩余额度，retry_after为需要暂停的秒数"""
+        with self._cond:
+            now = time.time()
+            self._refill(now)
+            if remaining is not None:
+                # 交易所按完整额度计数，扣除本地保留的余量后取较小值
+                self.remaining = max(0, min(self.remaining, remaining - (self.raw_limit - self.limit)))
+            if retry_after is not None:
+                self.remaining = 0
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            self._cond.notify_all()
+
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+_local = threading.local()
+
+
+def _bucket(url):
+    """返回(交易所, 预算键)，未知主机返回(None, None)"""
+    parts = urlsplit(url)
+    venue = VENUE_HOSTS.get(parts.hostname)
+    if venue is None:
+        return None, None
+    if venue == 'upbit':
+        segments = parts.path.strip('/').split('/')
+        return venue, f"upbit:{segments[1] if len(segments) > 1 else ''}"
+    return venue, venue
+
+
+def get_budget(url):
+    """返回请求所属的预算，不受调度的主机返回None"""
+    venue, key = _bucket(url)
+    if venue is None:
+        return None
+    with _budgets_lock:
+        if key not in _budgets:
+            _budgets[key] = Budget(*VENUE_LIMITS[venue])
+        return _budgets[key]
+
+
+def request_cost(url):
+    """返回请求消耗的额度（币安为请求权重）"""
+    parts = urlsplit(url)
+    if VENUE_HOSTS.get(parts.hostname) == 'binance':
+        return BINANCE_WEIGHTS.get(parts.path, 1)
+    return 1
+
+
+def current_priority():
+    return getattr(_local, 'priority', NORMAL)
+
+
+@contextmanager
+def priority(level):
+    """在当前线程内以指定优先级发送请求"""
+    previous = current_priority()
+    _local.priority = level
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def acquire(url):
+    """发送请求前调用：在所属交易所的预算内取得额度"""
+    budget = get_budget(url)
+    if budget is not None:
+        budget.acquire(request_cost(url), current_priority())
+
+
+def _remaining_from_headers(headers):
+    # Upbit: Remaining-Req: group=market; min=573; sec=9
+    remaining_req = headers.get('Remaining-Req')
+    if remaining_req:
+        for field in remaining_req.split(';'):
+            name, _, value = field.strip().partition('=')
+            if name == 'sec' and value.isdigit():
+                return int(value)
+    used_weight = headers.get('X-MBX-USED-WEIGHT-1M')
+    if used_weight and used_weight.isdigit():
+        return VENUE_LIMITS['binance'][0] - int(used_weight)
+    return None
+
+
+def observe(url, response):
+    """收到响应后调用：按响应头校正预算，429/418时暂停该交易所的请求"""
+    budget = get_budget(url)
+    if budget is None:
+        return
+    retry_after = None
+    if response.status_code in (418, 429):
+        value = response.headers.get('Retry-After')
+        retry_after = int(value) if value and value.isdigit() else budget.window
+    budget.observe(_remaining_from_headers(response.headers), retry_after)
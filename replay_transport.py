@@ -0,0 +1,222 @@
+"""交易所接口的录制/回放传输层及本地替身服务器
+
+录制：EXCHANGE_TRANSPORT=record:fixtures/run1 python ba_upbit_bithumb_final.py --refresh
+回放：EXCHANGE_TRANSPORT=replay:fixtures/run1 python ba_upbit_bithumb_final.py --refresh
+替身服务器：python replay_transport.py serve fixtures/run1 --port 8765
+           EXCHANGE_API_BASE=http://127.0.0.1:8765 python ba_upbit_bithumb_final.py --refresh
+
+录制时务必加--refresh，否则命中本地缓存的接口不会产生网络请求，也就不会被录下。
+"""
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+import http_client
+
+INDEX_FILE = 'index.json'
+# 录制时不保存的响应头：正文已解压，长度和连接相关的头由回放端重新生成
+_SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+
+def _normalize_query(query):
+    return urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+
+
+def _request_key(url, host=None):
+    """返回(主机, 路径, 排序后的查询串)，作为录制条目的匹配键"""
+    parts = urlsplit(url)
+    return host or parts.netloc, parts.path or '/', _normalize_query(parts.query)
+
+
+class Recording:
+    """一个录制目录：index.json保存条目元数据，响应正文保存为单独文件"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = []
+        self._lock = threading.Lock()
+        self._cursors = {}
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def add(self, url, status_code, reason, headers, content, host=None):
+        """追加一条录制的响应"""
+        host, path, query = _request_key(url, host)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            body_file = f"{len(self.entries):05d}.body"
+            with open(os.path.join(self.directory, body_file), 'wb') as f:
+                f.write(content)
+            self.entries.append({
+                'host': host,
+                'path': path,
+                'query': query,
+                'status': status_code,
+                'reason': reason,
+                'headers': {k: v for k, v in headers.items() if k.lower() not in _SKIPPED_HEADERS},
+                'body': body_file,
+            })
+            tmp_path = os.path.join(self.directory, f"{INDEX_FILE}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, os.path.join(self.directory, INDEX_FILE))
+
+    def lookup(self, host, path, query):
+        """查找录制的响应，返回(条目, 正文)；找不到时返回(None, None)
+
+        同一地址录制了多次时按录制顺序依次返回，用完后一直返回最后一条，
+        这样轮询类脚本也能得到确定的回放序列。
+        """
+        if host is None:
+            # 替身服务器未收到原主机名时只按路径匹配
+            candidates = [e for e in self.entries if (e['path'], e['query']) == (path, query)]
+        else:
+            candidates = [e for e in self.entries if (e['host'], e['path'], e['query']) == (host, path, query)]
+        if not candidates:
+            return None, None
+
+        key = (host, path, query)
+        with self._lock:
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+        entry = candidates[min(index, len(candidates) - 1)]
+        with open(os.path.join(self.directory, entry['body']), 'rb') as f:
+            return entry, f.read()
+
+
+class RecordingAdapter(HTTPAdapter):
+    """正常发送请求，同时把响应写入录制目录"""
+
+    def __init__(self, recording, **kwargs):
+        super().__init__(**kwargs)
+        self.recording = recording
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if request.method != 'GET':
+            # 连接预热等HEAD请求不录制
+            return response
+        # 读取正文后响应仍可正常使用（包括iter_content）
+        self.recording.add(request.url, response.status_code, response.reason, response.headers, response.content,
+                           request.headers.get('X-Forwarded-Host'))
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """不访问网络，从录制目录返回响应；未录制的地址返回404"""
+
+    def __init__(self, recording):
+        super().__init__()
+        self.recording = recording
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        entry, content = self.recording.lookup(*_request_key(request.url, request.headers.get('X-Forwarded-Host')))
+        response = Response()
+        response.request = request
+        response.url = request.url
+        if entry is None:
+            response.status_code = 404
+            response.reason = 'Not Recorded'
+            response.headers = CaseInsensitiveDict()
+            content = b''
+        else:
+            response.status_code = entry['status']
+            response.reason = entry['reason']
+            response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = content
+        response._content_consumed = True
+        return response
+
+    def close(self):
+        pass
+
+
+def install(spec):
+    """按"record:目录"或"replay:目录"启用录制或回放"""
+    mode, _, directory = spec.partition(':')
+    recording = Recording(directory)
+    if mode == 'record':
+        http_client.set_adapter_factory(lambda: RecordingAdapter(recording, max_retries=0))
+    elif mode == 'replay':
+        # 回放不访问交易所，不受交易所速率预算限制
+        http_client.set_adapter_factory(lambda: ReplayAdapter(recording), throttle=False)
+    else:
+        raise ValueError(f"未知的传输模式: {spec}（应为record:目录 或 replay:目录）")
+    print(f"交易所请求{'录制到' if mode == 'record' else '回放自'}: {directory}")
+    return recording
+
+
+def make_server(directory, host='127.0.0.1', port=8765):
+    """创建本地替身服务器，按录制的路径、查询参数和响应头返回数据"""
+    recording = Recording(directory)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _respond(self, send_body):
+            parts = urlsplit(self.path)
+            entry, content = recording.lookup(self.headers.get('X-Forwarded-Host'), parts.path or '/',
+                                              _normalize_query(parts.query))
+            if entry is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(entry['status'], entry['reason'])
+            for name, value in entry['headers'].items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(content)
+
+        def do_GET(self):
+            self._respond(send_body=True)
+
+        def do_HEAD(self):
+            self._respond(send_body=False)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="交易所接口录制数据工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help="启动本地替身服务器")
+    serve_parser.add_argument('directory')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    list_parser = subparsers.add_parser('list', help="列出录制的接口")
+    list_parser.add_argument('directory')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for entry in Recording(args.directory).entries:
+            query = f"?{entry['query']}" if entry['query'] else ''
+            print(f"{entry['status']} {entry['host']}{entry['path']}{query} -> {entry['body']}")
+        return
+
+    server = make_server(args.directory, args.host, args.port)
+    print(f"替身服务器已启动: http://{args.host}:{args.port}  (数据目录: {args.directory})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""报表之间的快速比较
+
+只读取需要的工作表和列：有分类币种长表（--sidecar输出）时直接读取它，
+列式报表目录只读对应文件，Excel报表优先用calamine引擎（需安装python-calamine），
+否则用openpyxl只读模式按行流式读取。比较使用哈希集合，耗时与数据量成线性关系。
+
+两份报表按指定工作表比较：
+    python report_diff.py output/upbit_pairs_A.xlsx output/bithumb_market_comparison_B.xlsx \\
+        --labels upbit bithumb --pair krw only_KRW_pairs only_KRW --output result.xlsx
+多份历史报表依次比较同名工作表的变化：
+    python report_diff.py output/Crypto_Exchange_Analysis_*.xlsx --output changes.xlsx
+"""
+import argparse
+import os
+
+import report_output
+from excel_writer import ReportWriter
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+
+def _present(value):
+    return value is not None and value != ''
+
+
+def _column_index(header, column):
+    """返回列在表头中的位置，column为None时取币种列"""
+    if column is not None:
+        return header.index(column)
+    return header.index(report_output.ASSET_COLUMN) if report_output.ASSET_COLUMN in header else 0
+
+
+class ReportReader:
+    """按需读取一份报表（Excel文件、列式报表目录或分类币种长表）中的工作表列"""
+
+    def __init__(self, path):
+        self.path = path
+        self.sidecar_only = os.path.splitext(path)[1].lstrip('.') in report_output.COLUMNAR_FORMATS
+        self.stem = os.path.splitext(path)[0] if path.endswith('.xlsx') else path.rstrip('/\\')
+        self.sidecar = self._load_sidecar()
+        self._workbook = None
+
+    def _load_sidecar(self):
+        if self.sidecar_only:
+            return report_output.read_sets(self.path)
+        for fmt in report_output.COLUMNAR_FORMATS:
+            sidecar_path = f"{self.stem}.{report_output.FORMATS[fmt]}"
+            if os.path.isfile(sidecar_path):
+                try:
+                    return report_output.read_sets(sidecar_path)
+                except (ImportError, ValueError, KeyError):
+                    continue
+        return None
+
+    def _table_file(self, sheet):
+        if not os.path.isdir(self.stem):
+            return None, None
+        for fmt in report_output.COLUMNAR_FORMATS:
+            path = os.path.join(self.stem, f"{sheet}.{report_output.FORMATS[fmt]}")
+            if os.path.isfile(path):
+                return path, fmt
+        return None, None
+
+    def sheet_names(self):
+        """返回报表中的工作表（分类）名称"""
+        if self.sidecar_only:
+            return list(self.sidecar)
+        if os.path.isdir(self.stem) and not self.path.endswith('.xlsx'):
+            return sorted({os.path.splitext(name)[0] for name in os.listdir(self.stem)})
+        if python_calamine is not None:
+            return list(self._calamine().sheet_names)
+        return list(self._openpyxl().sheetnames)
+
+    def values(self, sheet, column=None):
+        """返回工作表中一列的非空值列表
+
+        column为None时取币种列：交易对工作表为报价货币列，其余工作表为第一列，与长表中的币种一致。
+        """
+        if self.sidecar is not None and column in (None, report_output.ASSET_COLUMN):
+            if sheet in self.sidecar:
+                return list(self.sidecar[sheet])
+            if self.sidecar_only:
+                # 长表中不出现的分类为空
+                return []
+
+        path, fmt = self._table_file(sheet)
+        if path is not None:
+            return self._table_values(path, fmt, column)
+        if python_calamine is not None:
+            return self._calamine_values(sheet, column)
+        return self._openpyxl_values(sheet, column)
+
+    def _table_values(self, path, fmt, column):
+        # 只有列式报表需要pandas，读取Excel报表和比较集合时不加载
+        import pandas as pd
+        if fmt == 'parquet':
+            df = pd.read_parquet(path, columns=[column] if column else None)
+        elif fmt == 'feather':
+            df = pd.read_feather(path, columns=[column] if column else None)
+        elif fmt == 'csv':
+            df = pd.read_csv(path, usecols=[column] if column else None, keep_default_na=False)
+        else:
+            df = pd.read_json(path, orient='records', lines=True, dtype=False)
+        series = df.iloc[:, _column_index(list(df.columns), column)]
+        return [value for value in series.tolist() if _present(value) and not pd.isna(value)]
+
+    def _calamine(self):
+        if self._workbook is None:
+            self._workbook = python_calamine.CalamineWorkbook.from_path(self.path)
+        return self._workbook
+
+    def _calamine_values(self, sheet, column):
+        rows = self._calamine().get_sheet_by_name(sheet).iter_rows()
+        header = next(rows, [])
+        index = _column_index(header, column)
+        return [row[index] for row in rows if len(row) > index and _present(row[index])]
+
+    def _openpyxl(self):
+        if self._workbook is None:
+            import openpyxl
+            self._workbook = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        return self._workbook
+
+    def _openpyxl_values(self, sheet, column):
+        worksheet = self._openpyxl()[sheet]
+        header = next(worksheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        index = _column_index(list(header), column)
+        return [row[0] for row in worksheet.iter_rows(min_row=2, min_col=index + 1, max_col=index + 1,
+                                                      values_only=True) if _present(row[0])]
+
+    def close(self):
+        if self._workbook is not None and hasattr(self._workbook, 'close'):
+            self._workbook.close()
+        self._workbook = None
+
+
+def diff_values(left, right):
+    """返回(只在left中的值, 只在right中的值)，保持各自原有顺序"""
+    left_set = set(left)
+    right_set = set(right)
+    return [value for value in left if value not in right_set], [value for value in right if value not in left_set]
+
+
+def parse_sheet_spec(spec):
+    """解析"工作表[:列名]"，返回(工作表, 列名或None)"""
+    sheet, _, column = spec.partition(':')
+    return sheet, column or None
+
+
+def diff_reports(left_path, right_path, pairs, labels=('left', 'right')):
+    """按[(名称, 左工作表[:列], 右工作表[:列]), ...]比较两份报表
+
+    返回{结果工作表名: 值列表}，结果工作表名为"{标签}_{名称}_only"。
+    """
+    left, right = ReportReader(left_path), ReportReader(right_path)
+    try:
+        results = {}
+        for name, left_spec, right_spec in pairs:
+            only_left, only_right = diff_values(left.values(*parse_sheet_spec(left_spec)),
+                                                right.values(*parse_sheet_spec(right_spec)))
+            results[f"{labels[0]}_{name}_only"] = only_left
+            results[f"{labels[1]}_{name}_only"] = only_right
+        return results
+    finally:
+        left.close()
+        right.close()
+
+
+def diff_history(paths, sheets=None):
+    """依次比较相邻报表中同名工作表的币种列，返回变化记录列表"""
+    changes = []
+    previous = None
+    previous_values = {}
+    for path in paths:
+        reader = ReportReader(path)
+        try:
+            available = reader.sheet_names()
+            values = {name: reader.values(name) for name in (sheets or available) if name in available}
+        finally:
+            reader.close()
+        if previous is not None:
+            for name in values:
+                if name not in previous_values:
+                    continue
+                removed, added = diff_values(previous_values[name], values[name])
+                changes += [{'from': previous, 'to': path, 'sheet': name, 'asset': asset, 'action': 'added'}
+                            for asset in added]
+                changes += [{'from': previous, 'to': path, 'sheet': name, 'asset': asset, 'action': 'removed'}
+                            for asset in removed]
+        previous, previous_values = path, values
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="报表之间的快速比较")
+    parser.add_argument('reports', nargs='+', help="报表路径（xlsx、列式报表目录或分类币种长表）")
+    parser.add_argument('--pair', nargs=3, action='append', metavar=('NAME', 'LEFT', 'RIGHT'),
+                        help="比较两份报表的指定工作表，LEFT/RIGHT格式为 工作表[:列名]，可重复")
+    parser.add_argument('--labels', nargs=2, default=['left', 'right'], help="两份报表在结果中的标签")
+    parser.add_argument('--sheets', nargs='+', help="多份报表比较时只比较这些工作表")
+    parser.add_argument('--output', help="结果输出文件（xlsx），不指定则只打印")
+    args = parser.parse_args()
+
+    if args.pair:
+        if len(args.reports) != 2:
+            parser.error("--pair 需要正好两份报表")
+        results = diff_reports(args.reports[0], args.reports[1], args.pair, args.labels)
+        for sheet_name, values in results.items():
+            print(f"{sheet_name}: {len(values)} 个")
+        if args.output:
+            with ReportWriter(args.output) as writer:
+                for sheet_name, values in results.items():
+                    writer.write_values(sheet_name, sheet_name, values)
+            print(f"对比结果已保存到 {args.output}")
+        return
+
+    if len(args.reports) < 2:
+        parser.error("至少需要两份报表")
+    changes = diff_history(args.reports, args.sheets)
+    for change in changes:
+        action = '新增' if change['action'] == 'added' else '移除'
+        print(f"{os.path.basename(change['to'])} {change['sheet']} {action}: {change['asset']}")
+    print(f"共 {len(changes)} 项变化")
+    if args.output:
+        import pandas as pd
+        with ReportWriter(args.output) as writer:
+            writer.write_sheet('changes', pd.DataFrame(changes, columns=['from', 'to', 'sheet', 'asset', 'action']))
+        print(f"变化记录已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""报表计算图
+
+每个报表分类声明为一个节点，并列出它依赖的节点（交易所数据源或中间集合）。
+运行时只计算所选输出需要的节点：用到的数据源一次性并发获取，其余节点按声明顺序计算，
+每个节点只计算一次。节点必须在它的依赖之后声明，所以声明顺序就是计算顺序。
+每个节点的计算记为一个stage_metrics阶段，阶段类型在声明节点时指定（写报表的节点为write）。
+"""
+import stage_metrics
+
+
+class ReportGraph:
+    """报表节点及其依赖"""
+
+    def __init__(self):
+        self.nodes = {}  # 名称 -> (依赖列表, 计算函数)
+        self.kinds = {}  # 名称 -> 阶段类型
+        self.sources = []  # 数据源节点，由run的fetch_sources一次性获取
+        self.outputs = []  # 可以选择输出的节点，按声明顺序
+
+    def source(self, name):
+        """声明一个数据源节点"""
+        self.nodes[name] = ((), None)
+        self.sources.append(name)
+
+    def add(self, name, deps, func, output=False, kind=stage_metrics.COMPUTE):
+        """声明一个节点，func接收各依赖节点的值并返回本节点的值"""
+        for dep in deps:
+            if dep not in self.nodes:
+                raise ValueError(f"节点 {name} 的依赖 {dep} 尚未声明")
+        self.nodes[name] = (list(deps), func)
+        self.kinds[name] = kind
+        if output:
+            self.outputs.append(name)
+
+    def required(self, targets):
+        """返回计算targets需要的全部节点，按声明顺序排列"""
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.nodes:
+                raise ValueError(f"未知的节点: {name}")
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.nodes[name][0])
+        return [name for name in self.nodes if name in needed]
+
+    def sources_for(self, targets):
+        """返回targets用到的数据源"""
+        needed = set(self.required(targets))
+        return [name for name in self.sources if name in needed]
+
+    def run(self, targets, fetch_sources, errors=None):
+        """计算targets，返回{节点名: 值}（包含计算过程中用到的全部节点）
+
+        fetch_sources接收用到的数据源名称列表，返回{数据源名: 值}。
+        errors为字典时单个节点失败不中断运行：异常记录到errors[节点名]，
+        依赖它的节点不再计算，记录同一个异常，其余节点照常计算。
+        """
+        needed = self.required(targets)
+        values = dict(fetch_sources([name for name in needed if name in self.sources]))
+        for name in needed:
+            if name in values:
+                continue
+            deps, func = self.nodes[name]
+            failed = [dep for dep in deps if errors and dep in errors]
+            if failed:
+                errors[name] = errors[failed[0]]
+                continue
+            try:
+                with stage_metrics.stage(name, self.kinds[name]) as stage:
+                    values[name] = stage.set_records(func(*(values[dep] for dep in deps)))
+            except Exception as e:
+                if errors is None:
+                    raise
+                errors[name] = e
+        return values
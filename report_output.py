@@ -0,0 +1,139 @@
+"""报表的列式输出：Parquet/Feather、CSV、NDJSON
+
+--format选择非xlsx格式时，每个分类（工作表）写为目录中的一个文件；
+--sidecar在Excel文件旁边额外写一个长表(category, asset)，下游程序只需要币种集合时
+直接读取这个文件即可，不必解析xlsx。Parquet/Feather需要安装pyarrow。
+pandas和pyarrow只在真正读写文件时导入，导入本模块本身不会加载它们。
+"""
+import os
+from importlib.util import find_spec
+
+from excel_writer import ReportWriter
+
+# 只检查是否安装，不导入（导入pyarrow需要数百毫秒）
+HAS_PYARROW = find_spec('pyarrow') is not None
+
+# 输出格式 -> 文件扩展名
+FORMATS = {
+    'xlsx': 'xlsx',
+    'parquet': 'parquet',
+    'feather': 'feather',
+    'csv': 'csv',
+    'ndjson': 'ndjson',
+}
+COLUMNAR_FORMATS = [fmt for fmt in FORMATS if fmt != 'xlsx']
+ARROW_FORMATS = {'parquet', 'feather'}
+
+# 交易对工作表中表示币种的列，写入长表时交易对工作表取这一列，其余工作表取第一列
+ASSET_COLUMN = '报价货币'
+
+
+def check_format(fmt):
+    """检查输出格式可用，不可用时抛出ValueError"""
+    if fmt not in FORMATS:
+        raise ValueError(f"未知的输出格式: {fmt}（可选: {', '.join(FORMATS)}）")
+    if fmt in ARROW_FORMATS and not HAS_PYARROW:
+        raise ValueError(f"输出{fmt}格式需要安装pyarrow: pip install pyarrow")
+
+
+def add_arguments(parser, format_help="输出格式：xlsx为单个Excel文件，其余格式每个分类输出一个文件",
+                  sidecar_help="在Excel文件旁边额外输出分类币种长表(category, asset)的格式"):
+    """给入口脚本添加--format和--sidecar参数"""
+    parser.add_argument('--format', default='xlsx', choices=list(FORMATS), help=format_help)
+    parser.add_argument('--sidecar', choices=COLUMNAR_FORMATS, help=sidecar_help)
+
+
+def validate_args(parser, args):
+    """检查--format和--sidecar选择的格式可用，不可用时由parser报错退出"""
+    for fmt in (args.format, args.sidecar):
+        if fmt:
+            try:
+                check_format(fmt)
+            except ValueError as e:
+                parser.error(str(e))
+
+
+def write_frame(df, path, fmt):
+    """按格式写出一个DataFrame"""
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    elif fmt == 'feather':
+        df.reset_index(drop=True).to_feather(path)
+    elif fmt == 'csv':
+        df.to_csv(path, index=False, encoding='utf-8')
+    elif fmt == 'ndjson':
+        df.to_json(path, orient='records', lines=True, force_ascii=False)
+    else:
+        raise ValueError(f"不支持的列式格式: {fmt}")
+
+
+class TableWriter:
+    """与ReportWriter接口一致的列式写入器：每个工作表写为目录中的一个文件"""
+
+    def __init__(self, directory, fmt):
+        check_format(fmt)
+        os.makedirs(directory, exist_ok=True)
+        self.filename = directory
+        self.fmt = fmt
+
+    def write_sheet(self, sheet_name, df, styled=False, fit_columns=False):
+        """写出一个分类，styled/fit_columns只对Excel有意义，这里忽略"""
+        write_frame(df, os.path.join(self.filename, f"{sheet_name}.{FORMATS[self.fmt]}"), self.fmt)
+
+    def write_values(self, sheet_name, column, values, fit_columns=False):
+        import pandas as pd
+        self.write_sheet(sheet_name, pd.DataFrame(values, columns=[column]))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_writer(stem, fmt):
+    """按格式返回写入器：xlsx写为stem.xlsx，其余格式写为目录stem/下的文件"""
+    if fmt == 'xlsx':
+        return ReportWriter(f"{stem}.xlsx")
+    return TableWriter(stem, fmt)
+
+
+def sets_frame(sets):
+    """把{分类名: 币种列表}转换为长表(category, asset)"""
+    import pandas as pd
+    categories = []
+    assets = []
+    for name, values in sets.items():
+        values = list(values)
+        categories += [name] * len(values)
+        assets += values
+    return pd.DataFrame({'category': categories, 'asset': assets})
+
+
+def write_sidecar(sets, excel_filename, fmt):
+    """在Excel文件旁边写出分类币种长表，返回文件路径"""
+    check_format(fmt)
+    path = f"{os.path.splitext(excel_filename)[0]}.{FORMATS[fmt]}"
+    write_frame(sets_frame(sets), path, fmt)
+    return path
+
+
+def read_sets(path):
+    """读取write_sidecar写出的文件，返回{分类名: 币种集合}（空分类不在长表中）"""
+    import pandas as pd
+    fmt = os.path.splitext(path)[1].lstrip('.')
+    if fmt == 'parquet':
+        df = pd.read_parquet(path)
+    elif fmt == 'feather':
+        df = pd.read_feather(path)
+    elif fmt == 'csv':
+        df = pd.read_csv(path, keep_default_na=False)
+    else:
+        df = pd.read_json(path, orient='records', lines=True, dtype=False)
+    sets = {}
+    for category, asset in zip(df['category'], df['asset']):
+        sets.setdefault(category, set()).add(asset)
+    return sets
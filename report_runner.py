@@ -0,0 +1,187 @@
+"""一次获取交易所数据，生成全部报表
+
+各报表脚本单独运行时各自请求交易所、解析市场、计算分类，依次运行几个脚本时，
+得到的报表来自不同时刻的数据。这里把各脚本的报表声明为CryptoExchangeAnalyzer报表计算图上的节点：
+Upbit market/all、Bithumb KRW/BTC行情和币安exchangeInfo每次运行只并发获取一次，全部报表都由这一个快照生成；
+Upbit按报价货币的分组、K线上币日期、市场组合分类以及上币列表的币种整理等共享节点也只计算一次。
+--metrics-json/--metrics-prom导出各获取、解析、计算和写入阶段的耗时、字节数、内存和记录数。
+只选择部分报表时，只获取和计算它们用到的部分。
+上币列表脚本在模块顶层导入pandas，它们在生成对应报表时才导入，获取和分类阶段不会加载pandas。
+
+    python report_runner.py
+    python report_runner.py --reports final upbit_pairs --format parquet
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import bithumb_krw_btc_diff
+import last_good
+import report_output
+import response_cache
+import stage_metrics
+import upbit_krw_usdt_btc_diff
+from ba_upbit_bithumb_final import CryptoExchangeAnalyzer
+
+# 报表 -> (原脚本, 输出文件名前缀)
+# 两个上币列表脚本原本使用相同的文件名，整理后的版本加上后缀，以免同一次运行中互相覆盖
+REPORTS = {
+    'final': ('ba_upbit_bithumb_final.py', 'Crypto_Exchange_Analysis'),
+    'listing': ('ba_upbit_bithumb_listing.py', 'Exchange_Listings'),
+    'listing_cleaned': ('ba_upbit_bithumb_listing_cleaned.py', 'Exchange_Listings_Cleaned'),
+    'listing_compared': ('ba_upbit_bithumb_listing_compared.py', 'Exchange_Listings_Results'),
+    'upbit_pairs': ('upbit_krw_usdt_btc_diff.py', 'upbit_pairs'),
+    'bithumb_comparison': ('bithumb_krw_btc_diff.py', 'bithumb_market_comparison'),
+}
+
+
+def _currencies(pairs):
+    """返回Bithumb交易对的币种列表，保持接口返回的顺序"""
+    return [pair.base for pair in pairs]
+
+
+class ReportRunner:
+    """在分析器的报表计算图上声明各脚本的报表，一次运行生成所选的全部报表"""
+
+    def __init__(self, output_format='xlsx', sidecar=None):
+        # 输出格式只对综合报告和Upbit交易对报表有效，其余报表原本就只输出Excel
+        self.output_format = output_format
+        self.sidecar = sidecar
+        self.output_dir = "output"
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.timestamp = None
+        self.failures = {}  # 报表 -> 生成失败的异常
+        self.analyzer = CryptoExchangeAnalyzer()
+        self.graph = self.analyzer.graph
+        self.add_reports()
+
+    def add_reports(self):
+        """声明各报表节点：报表 <- 共享的中间节点 <- 分析器的数据源"""
+        graph = self.graph
+        sheets = list(graph.outputs)
+        graph.add('final', sheets, self.write_final, kind=stage_metrics.WRITE)
+
+        graph.add('listing_frames', ['binance', 'upbit', 'bithumb'], self.listing_frames)
+        graph.add('listing', ['listing_frames'], self.write_listing, kind=stage_metrics.WRITE)
+        graph.add('listing_assets', ['listing_frames'], self.listing_assets)
+        graph.add('listing_cleaned', ['listing_assets'], self.write_listing_cleaned, kind=stage_metrics.WRITE)
+        graph.add('listing_regions', ['listing_assets'], self.listing_regions)
+        graph.add('listing_compared', ['listing_regions'], self.write_listing_compared, kind=stage_metrics.WRITE)
+
+        # Upbit交易对报表只使用Upbit自己的上币日期，分组和市场组合与综合报告共用
+        graph.add('upbit_listing_dates', ['upbit', 'upbit_candle_dates'],
+                  upbit_krw_usdt_btc_diff.get_coin_listing_dates)
+        graph.add('upbit_pairs', ['upbit_index', 'upbit_categories', 'upbit_listing_dates'],
+                  self.write_upbit_pairs, kind=stage_metrics.WRITE)
+
+        graph.add('bithumb_markets', ['bithumb', 'bithumb_btc'], self.bithumb_markets)
+        graph.add('bithumb_comparison', ['bithumb_markets'], self.write_bithumb_comparison,
+                  kind=stage_metrics.WRITE)
+
+    def stem(self, report):
+        """返回报表不带扩展名的输出路径，同一次运行的报表使用相同的时间戳"""
+        _, prefix = REPORTS[report]
+        return os.path.join(self.output_dir, f"{prefix}_{self.timestamp}")
+
+    def write_final(self, *frames):
+        tables = dict(zip(self.graph.outputs, frames))
+        return self.analyzer.write_report(tables, self.output_format, self.sidecar, self.stem('final'))
+
+    def listing_frames(self, binance_pairs, upbit_markets, bithumb_pairs):
+        """上币列表脚本导出的(币安USDT, Upbit KRW, Bithumb KRW)交易对DataFrame"""
+        import ba_upbit_bithumb_listing as listing
+        return listing.listing_frames(binance_pairs, upbit_markets, bithumb_pairs)
+
+    def write_listing(self, frames):
+        import ba_upbit_bithumb_listing as listing
+        return listing.ExchangeListings().write_excel(*frames, filename=f"{self.stem('listing')}.xlsx")
+
+    def listing_assets(self, frames):
+        """只保留币种列的三家交易所交易对，整理后的上币列表和维恩比较共用"""
+        import ba_upbit_bithumb_listing_cleaned as listing_cleaned
+        return listing_cleaned.asset_frames(*frames)
+
+    def listing_regions(self, assets):
+        import ba_upbit_bithumb_listing_compared as listing_compared
+        return listing_compared.compare_assets(*assets)
+
+    def write_listing_cleaned(self, assets):
+        import ba_upbit_bithumb_listing_cleaned as listing_cleaned
+        return listing_cleaned.ExchangeListings().write_excel(
+            *assets, filename=f"{self.stem('listing_cleaned')}.xlsx")
+
+    def write_listing_compared(self, regions):
+        import ba_upbit_bithumb_listing_compared as listing_compared
+        return listing_compared.ExchangeListings().write_results(
+            regions, filename=f"{self.stem('listing_compared')}.xlsx")
+
+    def write_upbit_pairs(self, index, categories, listing_dates):
+        if not index.quotes:
+            print("无法获取Upbit市场信息，跳过Upbit交易对报表")
+            return None
+        # 复用已分组的索引，按Upbit自己的上币日期重新排序（没有日期时按交易对代码排序）
+        sheets = upbit_krw_usdt_btc_diff.build_sheets(index.reordered(listing_dates or None), categories)
+        return upbit_krw_usdt_btc_diff.write_report(sheets, listing_dates, self.output_format, self.sidecar,
+                                                    self.stem('upbit_pairs'))
+
+    def bithumb_markets(self, krw_pairs, btc_pairs):
+        """比较Bithumb KRW/BTC市场，任一市场获取失败且没有快照时返回None"""
+        if any(self.analyzer.venue_status[source][0] == last_good.FAILED for source in ('bithumb', 'bithumb_btc')):
+            return None
+        return bithumb_krw_btc_diff.compare_markets(_currencies(krw_pairs), _currencies(btc_pairs))
+
+    def write_bithumb_comparison(self, data):
+        return bithumb_krw_btc_diff.save_to_excel(data, f"{self.stem('bithumb_comparison')}.xlsx")
+
+    def run(self, reports=None):
+        """生成所选报表（默认全部），返回{报表: 输出文件名}，没有生成的报表为None
+
+        单个报表（或它用到的中间节点）失败时不影响其余报表，异常记录在self.failures中。
+        """
+        reports = reports or list(REPORTS)
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        errors = {}
+        values = self.graph.run(reports, self.analyzer.fetch_exchanges, errors)
+        self.failures = {report: errors[report] for report in reports if report in errors}
+        for report, error in self.failures.items():
+            print(f"生成{report}报表失败: {type(error).__name__}: {error}")
+        return {report: values.get(report) for report in reports}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="一次获取交易所数据，生成全部报表")
+    parser.add_argument('--refresh', action='store_true', help="忽略本地缓存，强制重新获取交易所数据")
+    parser.add_argument('--reports', nargs='+', metavar='REPORT', choices=list(REPORTS),
+                        help="只生成这些报表（默认全部），只获取它们用到的交易所")
+    parser.add_argument('--list-reports', action='store_true', help="列出可选的报表及其用到的数据源")
+    stage_metrics.add_arguments(parser)
+    report_output.add_arguments(parser, format_help="综合报告和Upbit交易对报表的输出格式，其余报表总是输出Excel",
+                                sidecar_help="在综合报告和Upbit交易对报表旁边额外输出分类币种长表(category, asset)的格式")
+    args = parser.parse_args()
+    report_output.validate_args(parser, args)
+    response_cache.set_refresh(args.refresh)
+
+    runner = ReportRunner(args.format, args.sidecar)
+    if args.list_reports:
+        for report, (script, _) in REPORTS.items():
+            print(f"{report} ({script}): {', '.join(runner.graph.sources_for([report]))}")
+        return
+
+    stage_metrics.configure(args)
+    try:
+        filenames = runner.run(args.reports)
+    finally:
+        stage_metrics.export(args)
+    print("\n=== 已生成的报表 ===")
+    for report, filename in filenames.items():
+        if report in runner.failures:
+            print(f"{report}: 失败")
+        else:
+            print(f"{report}: {filename or '未生成'}")
+    if runner.failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+import time
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import http_client
+import stage_metrics
+
+CACHE_DIR = os.path.join('.cache', 'http')
+
+# 各接口的缓存有效期（秒），未列出的接口默认不缓存
+ENDPOINT_TTLS = {
+    'https://api.binance.com/api/v3/exchangeInfo': 3600,
+    'https://api.upbit.com/v1/market/all': 60,
+    'https://api.bithumb.com/public/ticker/ALL_KRW': 30,
+    'https://api.bithumb.com/public/ticker/ALL_BTC': 30,
+    'https://www.okx.com/api/v5/public/instruments': 60,
+    'https://api.bybit.com/v5/market/instruments-info': 60,
+    'https://api.coinone.co.kr/public/v2/markets/KRW': 60,
+    'https://api.korbit.co.kr/v1/ticker/detailed/all': 30,
+}
+
+# 为True时忽略本地缓存，强制重新请求（对应命令行--refresh）
+_refresh = False
+
+
+def set_refresh(refresh):
+    """设置是否忽略缓存强制刷新"""
+    global _refresh
+    _refresh = bool(refresh)
+
+
+def endpoint_ttl(url):
+    """返回接口的缓存有效期，未配置时为0"""
+    return ENDPOINT_TTLS.get(url.split('?', 1)[0], 0)
+
+
+class CachedResponse:
+    """从本地缓存读取的响应，接口与requests.Response常用部分一致"""
+
+    def __init__(self, url, status_code, headers, content, from_cache=True):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=65536):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+    def close(self):
+        pass
+
+
+class StreamingResponse:
+    """边读取边写入缓存的流式响应，读完全部内容后缓存才生效
+
+    响应体只从网络读取一次：content在第一次访问时拼接并保留，之后的content和iter_content都使用它；
+    直接用iter_content读完后，再次读取从写好的缓存文件重放。只读了一部分就中断的流不能再读取。
+    """
+
+    def __init__(self, key, url, params, response):
+        self._key = key
+        self._url = url
+        self._params = params
+        self._response = response
+        self.url = response.url
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.from_cache = False
+        self.meta = None
+        self._content = None
+        self._started = False
+
+    @property
+    def ok(self):
+        return self._response.ok
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = b''.join(self.iter_content())
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=65536):
+        _, body_path = _paths(self._key)
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start:start + chunk_size]
+            return
+        if self.meta is not None:
+            # 已经读完并写入缓存，从缓存文件重放
+            with open(body_path, 'rb') as f:
+                yield from iter(lambda: f.read(chunk_size), b'')
+            return
+        if self._started:
+            raise requests.exceptions.StreamConsumedError()
+        self._started = True
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{body_path}.{os.getpid()}.tmp"
+        digest = hashlib.sha256()
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in self._response.iter_content(chunk_size):
+                    stage_metrics.add_bytes(len(chunk))
+                    digest.update(chunk)
+                    f.write(chunk)
+                    yield chunk
+        except BaseException:
+            # 未读完（或读取出错）时丢弃不完整的缓存文件
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, body_path)
+        self.meta = _store_meta(self._key, self._url, self._params, self._response, digest.hexdigest())
+
+    def raise_for_status(self):
+        self._response.raise_for_status()
+
+    def close(self):
+        self._response.close()
+
+
+def cache_key(url, params=None):
+    """按URL和参数生成缓存键"""
+    query = urlencode(sorted((params or {}).items()))
+    return hashlib.sha256(f"{url}?{query}".encode('utf-8')).hexdigest()
+
+
+def _paths(key):
+    base = os.path.join(CACHE_DIR, key)
+    return base + '.json', base + '.body'
+
+
+def _atomic_write(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _load(key):
+    meta_path, body_path = _paths(key)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(body_path, 'rb') as f:
+            content = f.read()
+    except (OSError, ValueError):
+        return None, None
+    return meta, content
+
+
+def _store(key, url, params, response, content):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _, body_path = _paths(key)
+    _atomic_write(body_path, content)
+    return _store_meta(key, url, params, response, hashlib.sha256(content).hexdigest())
+
+
+def _store_meta(key, url, params, response, digest):
+    meta = {
+        'url': url,
+        'params': params or {},
+        'fetched_at': time.time(),
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'content_type': response.headers.get('Content-Type'),
+        'digest': digest,
+    }
+    meta_path, _ = _paths(key)
+    _atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+    return meta
+
+
+def _touch(key, meta):
+    meta['fetched_at'] = time.time()
+    meta_path, _ = _paths(key)
+    _atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+
+
+def _cached_response(meta, content):
+    headers = {'Content-Type': meta.get('content_type') or 'application/json'}
+    return CachedResponse(meta['url'], 200, headers, content)
+
+
+def _fetch(url, params=None, headers=None, timeout=None, ttl=None, refresh=None, stream=False):
+    """返回(响应, 元数据)：缓存有效时直接读取，否则发送条件请求
+
+    stream为True且需要重新下载时返回StreamingResponse，元数据在读完内容后才可用。
+    """
+    ttl = endpoint_ttl(url) if ttl is None else ttl
+    refresh = _refresh if refresh is None else refresh
+    if ttl <= 0:
+        return http_client.get(url, params=params, headers=headers, timeout=timeout, stream=stream), None
+
+    key = cache_key(url, params)
+    meta, content = (None, None) if refresh else _load(key)
+    if meta is not None and time.time() - meta['fetched_at'] < ttl:
+        return _cached_response(meta, content), meta
+
+    request_headers = dict(headers or {})
+    if meta is not None:
+        if meta.get('etag'):
+            request_headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            request_headers['If-Modified-Since'] = meta['last_modified']
+
+    response = http_client.get(url, params=params, headers=request_headers, timeout=timeout, stream=stream)
+    if response.status_code == 304 and meta is not None:
+        # 内容未变化，只刷新缓存时间
+        response.close()
+        _touch(key, meta)
+        return _cached_response(meta, content), meta
+    if response.status_code == 200 and stream:
+        return StreamingResponse(key, url, params, response), None
+    if response.status_code == 200:
+        meta = _store(key, url, params, response, response.content)
+        return response, meta
+    return response, None
+
+
+def get(url, params=None, headers=None, timeout=None, ttl=None, refresh=None, stream=False):
+    """带本地缓存的GET请求，返回requests.Response、CachedResponse或StreamingResponse"""
+    response, _ = _fetch(url, params, headers, timeout, ttl, refresh, stream)
+    return response
+
+
+def get_derived(url, derive, name, params=None, headers=None, timeout=None, ttl=None, refresh=None,
+                stream=False):
+    """获取接口数据并返回derive(response)的结果
+
+    derive的结果（需可JSON序列化）与原始响应内容的摘要一起缓存，
+    响应内容未变化时直接读取，省去解析大体积JSON的开销。
+    stream为True时derive可以通过response.iter_content()边下载边解析。
+    """
+    response, meta = _fetch(url, params, headers, timeout, ttl, refresh, stream)
+    response.raise_for_status()
+    derived_path = os.path.join(CACHE_DIR, f"{cache_key(url, params)}.{name}.json")
+
+    if isinstance(response, StreamingResponse):
+        result = derive(response)
+        if response.meta is not None:
+            _atomic_write(derived_path, json.dumps({'digest': response.meta['digest'], 'result': result},
+                                                   ensure_ascii=False).encode('utf-8'))
+        return result
+    if meta is None:
+        return derive(response)
+
+    try:
+        with open(derived_path, 'r', encoding='utf-8') as f:
+            derived = json.load(f)
+        if derived['digest'] == meta['digest']:
+            return derived['result']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    result = derive(response)
+    _atomic_write(derived_path, json.dumps({'digest': meta['digest'], 'result': result},
+                                           ensure_ascii=False).encode('utf-8'))
+    return result
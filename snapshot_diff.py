@@ -0,0 +1,136 @@
+"""按增量维护各交易所/报价市场的币种集合及派生分类
+
+币种集合保存在VennEngine中：每个币种记录一个位掩码，表示它出现在哪些(交易所, 报价市场)中。
+新快照到达时只和上一次的位图做一次异或，找出新增和移除的币种，
+然后只对这些币种重新判断所属分类，轮询时的开销与变化数量成正比。
+"""
+from venn_engine import VennEngine, region_predicates
+
+# 数据源（交易所_报价市场）及其在位掩码中的位置
+SOURCES = ['Binance_USDT', 'Bithumb_KRW', 'Upbit_KRW', 'Upbit_USDT', 'Upbit_BTC', 'Upbit_ALL']
+SOURCE_BITS = {name: 1 << i for i, name in enumerate(SOURCES)}
+
+BINANCE = SOURCE_BITS['Binance_USDT']
+BITHUMB = SOURCE_BITS['Bithumb_KRW']
+UPBIT_KRW = SOURCE_BITS['Upbit_KRW']
+UPBIT_USDT = SOURCE_BITS['Upbit_USDT']
+UPBIT_BTC = SOURCE_BITS['Upbit_BTC']
+UPBIT = SOURCE_BITS['Upbit_ALL']
+
+# 参与维恩区域划分的集合
+UPBIT_QUOTE_BITS = {'KRW': UPBIT_KRW, 'USDT': UPBIT_USDT, 'BTC': UPBIT_BTC}
+EXCHANGE_BITS = {'Binance': BINANCE, 'Bithumb': BITHUMB, 'Upbit': UPBIT}
+
+
+def _has(mask, bits):
+    return mask & bits == bits
+
+
+def _usdt_btc_not_krw(m):
+    return _has(m, UPBIT_USDT | UPBIT_BTC) and not m & UPBIT_KRW
+
+
+def _binance_bithumb_not_upbit_krw(m):
+    return _has(m, BINANCE | BITHUMB) and not m & UPBIT_KRW
+
+
+def _upbit_region_name(quotes):
+    if len(quotes) == 1:
+        return f'Upbit_only_{quotes[0]}'
+    if len(quotes) == len(UPBIT_QUOTE_BITS):
+        return 'Upbit_all_markets'
+    missing = [quote for quote in UPBIT_QUOTE_BITS if quote not in quotes]
+    return f"Upbit_{'_'.join(quotes)}_not_{'_'.join(missing)}"
+
+
+def _exchange_region_name(exchanges):
+    if len(exchanges) == 1:
+        return f'Only_{exchanges[0]}'
+    if len(exchanges) == len(EXCHANGE_BITS):
+        return 'All_Exchanges'
+    return '_'.join(exchanges)
+
+
+# Upbit报价市场组合：KRW/USDT/BTC的每个维恩区域，如Upbit_only_KRW、Upbit_USDT_BTC_not_KRW
+UPBIT_CATEGORIES = region_predicates(UPBIT_QUOTE_BITS, _upbit_region_name)
+
+# 交易所间组合：三家交易所的每个维恩区域，另加基于Upbit报价市场的组合
+EXCHANGE_CATEGORIES = dict(region_predicates(EXCHANGE_BITS, _exchange_region_name), **{
+    'Common_Pairs': lambda m: _binance_bithumb_not_upbit_krw(m) and _usdt_btc_not_krw(m),
+    'Only_Binance_Bithumb': lambda m: _binance_bithumb_not_upbit_krw(m) and not _usdt_btc_not_krw(m),
+    'Only_Upbit_USDT_BTC': lambda m: _usdt_btc_not_krw(m) and not _binance_bithumb_not_upbit_krw(m),
+})
+
+ALL_CATEGORIES = dict(UPBIT_CATEGORIES, **EXCHANGE_CATEGORIES)
+
+
+class IncrementalSnapshot:
+    """保存上一次的各数据源币种集合，按增量更新派生分类"""
+
+    def __init__(self, categories=None):
+        self.categories = ALL_CATEGORIES if categories is None else categories
+        self.engine = VennEngine(SOURCES)
+        self.results = {name: set() for name in self.categories}
+
+    def update(self, source, assets):
+        """用数据源的最新币种集合更新状态
+
+        返回{分类名: (新进入的币种集合, 移出的币种集合)}，只包含有变化的分类。
+        """
+        added, removed = self.engine.update(source, assets)
+        symbols = self.engine.table.symbols
+        masks = self.engine.masks
+
+        changes = {}
+        for symbol_id in added + removed:
+            asset = symbols[symbol_id]
+            mask = masks[symbol_id]
+            for name, predicate in self.categories.items():
+                members = self.results[name]
+                inside = bool(predicate(mask))
+                if inside == (asset in members):
+                    continue
+                entered, left = changes.setdefault(name, (set(), set()))
+                if inside:
+                    members.add(asset)
+                    entered.add(asset)
+                else:
+                    members.discard(asset)
+                    left.add(asset)
+        return changes
+
+    def update_upbit(self, markets):
+        """按Upbit市场列表（交易对代码，如KRW-BTC）更新Upbit各报价市场及全部市场的币种集合"""
+        by_quote = {}
+        for market in markets:
+            quote, base = market.split('-', 1)
+            by_quote.setdefault(quote, []).append(base)
+        return self.update_upbit_quotes(by_quote)
+
+    def update_upbit_quotes(self, by_quote):
+        """按{报价货币: 币种列表}更新Upbit各报价市场及全部市场的币种集合"""
+        changes = {}
+        for quote in UPBIT_QUOTE_BITS:
+            _merge_changes(changes, self.update(f'Upbit_{quote}', by_quote.get(quote, ())))
+        _merge_changes(changes, self.update('Upbit_ALL', {base for bases in by_quote.values() for base in bases}))
+        return {name: change for name, change in changes.items() if change[0] or change[1]}
+
+    def category(self, name):
+        """返回分类当前包含的币种集合"""
+        return self.results[name]
+
+
+def _merge_changes(changes, new_changes):
+    for name, (entered, left) in new_changes.items():
+        total_entered, total_left = changes.setdefault(name, (set(), set()))
+        # 同一轮内先移出后进入（或相反）的币种互相抵消
+        for asset in entered:
+            if asset in total_left:
+                total_left.discard(asset)
+            else:
+                total_entered.add(asset)
+        for asset in left:
+            if asset in total_entered:
+                total_entered.discard(asset)
+            else:
+                total_left.add(asset)
@@ -0,0 +1,273 @@
+"""各阶段的耗时、传输量、内存和记录数
+
+获取、解析、计算和写入的每个阶段用stage()包裹，记录墙钟耗时、阶段内收到的响应体字节数
+（缓存命中不计，经过解压后的长度）、阶段结束时的进程峰值RSS、tracemalloc峰值（调用
+trace_memory()开启后）以及处理的记录数。结果可以导出为JSON，或写为Prometheus
+node_exporter textfile收集器读取的文本文件，用于跟踪性能回退和SLO。
+
+    with stage_metrics.stage('binance', stage_metrics.FETCH) as s:
+        pairs = ...
+        s.set_records(pairs)
+
+阶段按线程嵌套：响应字节计入当前线程上所有进行中的阶段；线程池中的工作线程可以用
+attached(active())把调用线程的阶段带过去。
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# 阶段类型
+FETCH = 'fetch'
+PARSE = 'parse'
+COMPUTE = 'compute'
+WRITE = 'write'
+
+# Prometheus指标名前缀
+METRIC_PREFIX = 'crypto_report'
+
+_lock = threading.Lock()
+_local = threading.local()
+_stages = []
+_running = 0
+_started_at = time.time()
+_start = time.perf_counter()
+
+
+def _max_rss_bytes():
+    """返回进程到目前为止的峰值RSS（字节），不支持的平台返回None"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS以字节为单位，Linux以KB为单位
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class Stage:
+    """一个阶段的测量结果"""
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.started_at = time.time()
+        self.seconds = None
+        self.bytes = 0
+        self.records = None
+        self.max_rss_bytes = None
+        self.tracemalloc_peak_bytes = None
+        self.error = None
+        self._start = time.perf_counter()
+
+    def set_records(self, value):
+        """按结果的长度记录处理的记录数，没有长度的结果（以及文件名等字符串）不记录"""
+        if hasattr(value, '__len__') and not isinstance(value, (str, bytes)):
+            self.records = len(value)
+        return value
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'kind': self.kind,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec='milliseconds'),
+            'seconds': self.seconds,
+            'bytes': self.bytes,
+            'records': self.records,
+            'max_rss_bytes': self.max_rss_bytes,
+            'tracemalloc_peak_bytes': self.tracemalloc_peak_bytes,
+            'error': self.error,
+        }
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def trace_memory():
+    """开启tracemalloc，之后结束的阶段记录Python分配的峰值（有额外开销，默认不开启）"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+@contextmanager
+def stage(name, kind):
+    """测量一个阶段，阶段内抛出的异常记录后继续向上抛出"""
+    global _running
+    current = Stage(name, kind)
+    with _lock:
+        # 没有其他阶段进行中时重置峰值，峰值从最外层阶段开始计算
+        if _running == 0 and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        _running += 1
+    stack = _stack()
+    stack.append(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        stack.remove(current)
+        current.seconds = time.perf_counter() - current._start
+        current.max_rss_bytes = _max_rss_bytes()
+        if tracemalloc.is_tracing():
+            current.tracemalloc_peak_bytes = tracemalloc.get_traced_memory()[1]
+        with _lock:
+            _running -= 1
+            _stages.append(current)
+
+
+def active():
+    """返回当前线程上进行中的阶段"""
+    return tuple(_stack())
+
+
+@contextmanager
+def attached(stages):
+    """在工作线程中把调用线程的阶段作为当前阶段（只计入字节数，不另外计时）"""
+    stack = _stack()
+    stack.extend(stages)
+    try:
+        yield
+    finally:
+        del stack[len(stack) - len(stages):]
+
+
+def add_bytes(count):
+    """把收到的响应字节数计入当前线程上进行中的阶段"""
+    stack = _stack()
+    if stack and count:
+        with _lock:
+            for current in stack:
+                current.bytes += count
+
+
+def stages():
+    """返回已结束的阶段，按结束顺序排列"""
+    with _lock:
+        return list(_stages)
+
+
+def reset():
+    """清空已记录的阶段，重新开始计时"""
+    global _started_at, _start
+    with _lock:
+        _stages.clear()
+        _started_at = time.time()
+        _start = time.perf_counter()
+
+
+def summary():
+    """返回本次运行的全部测量结果"""
+    return {
+        'started_at': datetime.fromtimestamp(_started_at).isoformat(timespec='seconds'),
+        'seconds': time.perf_counter() - _start,
+        'max_rss_bytes': _max_rss_bytes(),
+        'stages': [current.as_dict() for current in stages()],
+    }
+
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_json(path):
+    """把测量结果写为JSON文件"""
+    _atomic_write(path, json.dumps(summary(), ensure_ascii=False, indent=2))
+    return path
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# (指标名, 说明, 阶段字段, 同名阶段多次出现时的合并方式)
+STAGE_METRICS = [
+    ('stage_seconds', '阶段墙钟耗时（秒）', 'seconds', sum),
+    ('stage_bytes', '阶段内收到的响应体字节数', 'bytes', sum),
+    ('stage_records', '阶段处理的记录数', 'records', sum),
+    ('stage_max_rss_bytes', '阶段结束时的进程峰值RSS（字节）', 'max_rss_bytes', max),
+    ('stage_tracemalloc_peak_bytes', '阶段结束时的tracemalloc峰值（字节）', 'tracemalloc_peak_bytes', max),
+    ('stage_errors', '阶段以异常结束的次数', 'error', None),
+]
+
+
+def prometheus_text():
+    """按Prometheus文本格式返回测量结果，同名同类型的阶段合并为一个时间序列"""
+    result = summary()
+    groups = {}
+    for current in result['stages']:
+        groups.setdefault((current['stage'], current['kind']), []).append(current)
+
+    lines = []
+    for metric, help_text, field, combine in STAGE_METRICS:
+        name = f"{METRIC_PREFIX}_{metric}"
+        samples = []
+        for (stage_name, kind), group in groups.items():
+            if combine is None:
+                value = sum(1 for current in group if current[field])
+            else:
+                values = [current[field] for current in group if current[field] is not None]
+                if not values:
+                    continue
+                value = combine(values)
+            samples.append(f'{name}{{stage="{_label(stage_name)}",kind="{_label(kind)}"}} {value}')
+        if samples:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"] + samples
+
+    run_metrics = [
+        ('run_seconds', '本次运行的总耗时（秒）', result['seconds']),
+        ('run_max_rss_bytes', '本次运行的进程峰值RSS（字节）', result['max_rss_bytes']),
+        ('last_run_timestamp_seconds', '本次运行结束的Unix时间戳', time.time()),
+    ]
+    for metric, help_text, value in run_metrics:
+        if value is not None:
+            name = f"{METRIC_PREFIX}_{metric}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path):
+    """写出Prometheus textfile（先写临时文件再替换，收集器不会读到写了一半的文件）"""
+    _atomic_write(path, prometheus_text())
+    return path
+
+
+def add_arguments(parser):
+    """给入口脚本添加导出测量结果的命令行参数"""
+    parser.add_argument('--metrics-json', metavar='PATH', help="把各阶段的耗时、字节数、内存和记录数写为JSON文件")
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help="把各阶段的测量结果写为Prometheus textfile（如node_exporter textfile目录中的.prom文件）")
+    parser.add_argument('--trace-memory', action='store_true', help="开启tracemalloc，记录各阶段的Python内存分配峰值")
+
+
+def configure(args):
+    """按命令行参数开始测量"""
+    if args.trace_memory:
+        trace_memory()
+    reset()
+
+
+def export(args):
+    """按命令行参数导出测量结果"""
+    if args.metrics_json:
+        print(f"阶段测量结果已保存到: {write_json(args.metrics_json)}")
+    if args.metrics_prom:
+        print(f"Prometheus指标已保存到: {write_prometheus(args.metrics_prom)}")
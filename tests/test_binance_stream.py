@@ -0,0 +1,111 @@
+"""binance_stream在任意位置切分的数据块上得到与一次性解析相同的结果"""
+import json
+
+import pytest
+
+import binance_stream
+import exchange_schemas
+
+
+def symbol(base, quote='USDT', status='TRADING', **extra):
+    return dict({
+        'symbol': f'{base}{quote}',
+        'status': status,
+        'baseAsset': base,
+        'quoteAsset': quote,
+        'isSpotTradingAllowed': True,
+        'filters': [
+            {'filterType': 'PRICE_FILTER', 'tickSize': '0.01000000'},
+            {'filterType': 'LOT_SIZE', 'minQty': '0.00100000', 'stepSize': '0.00100000'},
+        ],
+    }, **extra)
+
+
+EXCHANGE_INFO = {
+    # symbols之前的非ASCII内容：切分点可能落在多字节字符中间
+    'timezone': 'UTC',
+    'notice': '거래소 공지 — 币安 ✓',
+    'rateLimits': [],
+    'symbols': [
+        symbol('BTC', onboardDate=1500000000000),
+        symbol('ETH', quote='BTC'),
+        symbol('한국', note='비트코인 {"symbols": [ ] }'),
+        symbol('XRP', status='BREAK'),
+        symbol('DOGE', filters=[]),
+    ],
+    'sors': [],
+}
+BODY = json.dumps(EXCHANGE_INFO, ensure_ascii=False, indent=1).encode('utf-8')
+EXPECTED = [s for s in EXCHANGE_INFO['symbols'] if binance_stream.is_usdt_spot_trading(s)]
+
+
+class FakeResponse:
+    def __init__(self, chunks, from_cache=False):
+        self.chunks = chunks
+        self.from_cache = from_cache
+        self.content = b''.join(chunks)
+
+    def iter_content(self, chunk_size):
+        return iter(self.chunks)
+
+
+def split_at(data, *offsets):
+    bounds = [0, *offsets, len(data)]
+    return [data[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def test_body_contains_multibyte_characters():
+    assert len(BODY) > len(BODY.decode('utf-8'))
+
+
+def test_every_two_chunk_split():
+    for offset in range(1, len(BODY)):
+        symbols = list(binance_stream.iter_symbols(split_at(BODY, offset), binance_stream.is_usdt_spot_trading))
+        assert symbols == EXPECTED, offset
+
+
+def test_single_byte_chunks():
+    chunks = [BODY[i:i + 1] for i in range(len(BODY))]
+    assert list(binance_stream.iter_symbols(chunks, binance_stream.is_usdt_spot_trading)) == EXPECTED
+
+
+def test_split_inside_symbols_key_and_multibyte_character():
+    key = BODY.index(b'"symbols"')
+    multibyte = BODY.index('한국'.encode('utf-8'))
+    chunks = split_at(BODY, key + 4, multibyte + 1, multibyte + 4)
+    assert list(binance_stream.iter_symbols(chunks)) == EXCHANGE_INFO['symbols']
+
+
+def test_reads_remaining_chunks_after_array():
+    consumed = []
+
+    def chunks():
+        for chunk in split_at(BODY, 100, 200, len(BODY) - 5):
+            consumed.append(chunk)
+            yield chunk
+
+    list(binance_stream.iter_symbols(chunks()))
+    assert b''.join(consumed) == BODY
+
+
+def test_truncated_response_raises():
+    with pytest.raises(ValueError):
+        list(binance_stream.iter_symbols(split_at(BODY[:len(BODY) // 2], 10)))
+    with pytest.raises(ValueError):
+        list(binance_stream.iter_symbols([b'{"timezone": "UTC"}']))
+
+
+def test_usdt_pair_rows():
+    rows = binance_stream.parse_usdt_pairs(FakeResponse(split_at(BODY, 333, 777)))
+    assert [row[:3] for row in rows] == [('BTCUSDT', 'BTC', 'USDT'), ('한국USDT', '한국', 'USDT'),
+                                         ('DOGEUSDT', 'DOGE', 'USDT')]
+    assert rows[0][3:6] == ('0.01000000', '0.00100000', '0.00100000')
+    assert rows[0][6] != 'N/A'
+    assert rows[2][3:] == ('N/A', 'N/A', 'N/A', 'N/A')
+
+
+@pytest.mark.skipif(not exchange_schemas.HAS_MSGSPEC, reason="需要msgspec")
+def test_cached_response_matches_streaming_parse():
+    streamed = binance_stream.parse_usdt_pairs(FakeResponse(split_at(BODY, 500)))
+    cached = binance_stream.parse_usdt_pairs(FakeResponse([BODY], from_cache=True))
+    assert [tuple(row) for row in cached] == streamed
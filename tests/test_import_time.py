@@ -0,0 +1,16 @@
+"""入口模块不提前加载重型库，导入耗时不超过预算"""
+import os
+
+import pytest
+
+import import_check
+
+
+@pytest.mark.parametrize('module', import_check.ENTRY_MODULES)
+def test_entry_module_import(module, monkeypatch):
+    # check_module在新的解释器中导入，模块要能从当前目录找到
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(import_check.__file__)))
+    elapsed, heavy = import_check.check_module(module)
+    assert heavy == []
+    assert elapsed is not None
+    assert elapsed <= import_check.DEFAULT_BUDGET_MS
@@ -0,0 +1,73 @@
+"""MarketIndex的分组、排序和筛选"""
+from market_index import MarketIndex, group_bases
+
+
+def market(code, name=''):
+    return {'market': code, 'korean_name': name, 'english_name': name}
+
+
+MARKETS = [
+    market('KRW-XRP'),
+    market('KRW-BTC'),
+    market('USDT-BTC'),
+    market('KRW-ETH'),
+    market('BTC-XRP'),
+    market('KRW-DOGE'),
+    market('BTC-ETH'),
+]
+LISTING_DATES = {'BTC': '2017-09-25', 'ETH': '2017-09-25', 'XRP': '2018-01-10'}
+
+
+def codes(markets):
+    return [m['market'] for m in markets]
+
+
+def test_groups_sorted_by_market_code():
+    index = MarketIndex(MARKETS)
+    assert list(index.quotes) == ['KRW', 'USDT', 'BTC']
+    assert codes(index.pairs('KRW')) == ['KRW-BTC', 'KRW-DOGE', 'KRW-ETH', 'KRW-XRP']
+    assert index.bases('KRW') == ['BTC', 'DOGE', 'ETH', 'XRP']
+    assert index.pairs('EUR') == []
+    assert index.bases('EUR') == []
+
+
+def test_sorted_by_listing_date_with_unknown_last():
+    index = MarketIndex(MARKETS, LISTING_DATES)
+    # 相同日期保持快照中的原顺序，没有日期的排在最后
+    assert index.bases('KRW') == ['BTC', 'ETH', 'XRP', 'DOGE']
+    assert index.bases('BTC') == ['ETH', 'XRP']
+
+
+def test_select_keeps_order():
+    index = MarketIndex(MARKETS, LISTING_DATES)
+    assert codes(index.select('KRW', {'DOGE', 'BTC', 'SOL'})) == ['KRW-BTC', 'KRW-DOGE']
+    assert index.select('KRW', set()) == []
+    assert index.select('EUR', {'BTC'}) == []
+
+
+def test_reordered_reuses_groups():
+    index = MarketIndex(MARKETS)
+    by_date = index.reordered(LISTING_DATES)
+    assert by_date.groups is index.groups
+    assert by_date.bases('KRW') == ['BTC', 'ETH', 'XRP', 'DOGE']
+    # 原索引的顺序不变
+    assert index.bases('KRW') == ['BTC', 'DOGE', 'ETH', 'XRP']
+    assert by_date.reordered().bases('KRW') == index.bases('KRW')
+
+
+def test_pairs_are_the_original_market_dicts():
+    index = MarketIndex(MARKETS)
+    assert index.pairs('USDT')[0] is MARKETS[2]
+
+
+def test_bases_by_quote_and_group_bases():
+    index = MarketIndex(MARKETS, LISTING_DATES)
+    assert index.bases_by_quote() == {'KRW': ['BTC', 'ETH', 'XRP', 'DOGE'], 'USDT': ['BTC'], 'BTC': ['ETH', 'XRP']}
+    # group_bases不排序，保持快照中的原顺序
+    assert group_bases(MARKETS) == {'KRW': ['XRP', 'BTC', 'ETH', 'DOGE'], 'USDT': ['BTC'], 'BTC': ['XRP', 'ETH']}
+    assert group_bases([]) == {}
+
+
+def test_market_code_with_dash_in_base():
+    index = MarketIndex([market('KRW-ABC-1')])
+    assert index.bases('KRW') == ['ABC-1']
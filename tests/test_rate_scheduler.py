@@ -0,0 +1,145 @@
+"""rate_scheduler的响应头解析、预算校正和等待"""
+import threading
+import time
+
+import pytest
+
+import rate_scheduler
+from rate_scheduler import Budget
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+@pytest.fixture(autouse=True)
+def fresh_budgets(monkeypatch):
+    monkeypatch.setattr(rate_scheduler, '_budgets', {})
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "等待超时"
+        time.sleep(0.005)
+
+
+def start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+@pytest.mark.parametrize('headers, expected', [
+    ({'Remaining-Req': 'group=market; min=573; sec=9'}, 9),
+    ({'Remaining-Req': 'group=candles;sec=0'}, 0),
+    ({'Remaining-Req': 'group=market; min=573'}, None),
+    ({'Remaining-Req': 'group=market; sec=abc'}, None),
+    ({'X-MBX-USED-WEIGHT-1M': '120'}, 6000 - 120),
+    ({'X-MBX-USED-WEIGHT-1M': ''}, None),
+    ({}, None),
+])
+def test_remaining_from_headers(headers, expected):
+    assert rate_scheduler._remaining_from_headers(headers) == expected
+
+
+def test_buckets_and_costs():
+    assert rate_scheduler._bucket('https://api.upbit.com/v1/candles/days?market=KRW-BTC') == ('upbit', 'upbit:candles')
+    assert rate_scheduler._bucket('https://api.upbit.com/v1/market/all') == ('upbit', 'upbit:market')
+    assert rate_scheduler._bucket('https://api3.binance.com/api/v3/klines') == ('binance', 'binance')
+    assert rate_scheduler._bucket('https://example.com/') == (None, None)
+    assert rate_scheduler.get_budget('https://example.com/') is None
+    assert rate_scheduler.request_cost('https://api.binance.com/api/v3/exchangeInfo') == 20
+    assert rate_scheduler.request_cost('https://api.binance.com/api/v3/time') == 1
+    assert rate_scheduler.request_cost('https://api.upbit.com/v1/market/all') == 1
+
+
+def test_mirror_hosts_share_a_budget():
+    binance = rate_scheduler.get_budget('https://api.binance.com/api/v3/exchangeInfo')
+    assert rate_scheduler.get_budget('https://api1.binance.com/api/v3/klines') is binance
+    assert rate_scheduler.get_budget('https://api.upbit.com/v1/market/all') is not \
+        rate_scheduler.get_budget('https://api.upbit.com/v1/candles/days')
+
+
+def test_observe_remaining_keeps_safety_margin():
+    budget = Budget(10, 60)
+    budget.acquire()
+    assert budget.remaining == 8
+    budget.observe(remaining=5)
+    # 交易所报告的5个里有1个是本地保留的余量
+    assert budget.remaining == 4
+    budget.observe(remaining=9)
+    assert budget.remaining == 4
+
+
+def test_acquire_waits_for_next_window():
+    budget = Budget(1, 60)
+    budget.acquire()
+    assert budget.remaining == 0
+    budget.reset_at = time.time() + 0.2
+
+    start_time = time.perf_counter()
+    budget.acquire()
+    assert time.perf_counter() - start_time >= 0.15
+
+
+def test_retry_after_blocks_budget():
+    budget = Budget(10, 60)
+    budget.acquire()
+    budget.observe(retry_after=0.2)
+    assert budget.remaining == 0
+    # 暂停到期后窗口才重新计数
+    budget.reset_at = time.time() + 0.2
+
+    start_time = time.perf_counter()
+    budget.acquire()
+    assert time.perf_counter() - start_time >= 0.15
+
+
+def test_429_response_pauses_venue():
+    url = 'https://api.korbit.co.kr/v1/ticker/detailed/all'
+    rate_scheduler.observe(url, FakeResponse(429, {'Retry-After': '30'}))
+    budget = rate_scheduler.get_budget(url)
+    assert budget.blocked_until >= time.time() + 29
+    assert budget.remaining == 0
+
+    rate_scheduler.observe(url, FakeResponse(418))
+    assert rate_scheduler.get_budget(url).blocked_until >= time.time() + 29
+
+
+def test_higher_priority_goes_first():
+    budget = Budget(1, 60)
+    budget.acquire()
+    budget.reset_at = time.time() + 0.2
+    order = []
+
+    def request(level):
+        budget.acquire(priority=level)
+        order.append(level)
+
+    low = start(request, rate_scheduler.LOW)
+    wait_until(lambda: len(budget._waiters) == 1)
+    high = start(request, rate_scheduler.HIGH)
+    wait_until(lambda: len(budget._waiters) == 2)
+
+    high.join(2)
+    assert order == [rate_scheduler.HIGH]
+    # 低优先级的请求要等下一个窗口
+    assert low.is_alive()
+    with budget._cond:
+        budget.reset_at = time.time()
+        budget._cond.notify_all()
+    low.join(2)
+    assert order == [rate_scheduler.HIGH, rate_scheduler.LOW]
+
+
+def test_priority_context():
+    assert rate_scheduler.current_priority() == rate_scheduler.NORMAL
+    with rate_scheduler.priority(rate_scheduler.LOW):
+        assert rate_scheduler.current_priority() == rate_scheduler.LOW
+        with rate_scheduler.priority(rate_scheduler.HIGH):
+            assert rate_scheduler.current_priority() == rate_scheduler.HIGH
+        assert rate_scheduler.current_priority() == rate_scheduler.LOW
+    assert rate_scheduler.current_priority() == rate_scheduler.NORMAL
@@ -0,0 +1,88 @@
+"""IncrementalSnapshot按增量更新的分类及返回的变化"""
+import random
+
+from snapshot_diff import IncrementalSnapshot, UPBIT_CATEGORIES
+
+
+def test_first_update_enters_all_assets():
+    snapshot = IncrementalSnapshot()
+    changes = snapshot.update('Binance_USDT', ['BTC', 'ETH'])
+    assert changes == {'Only_Binance': ({'BTC', 'ETH'}, set())}
+    assert snapshot.category('Only_Binance') == {'BTC', 'ETH'}
+
+
+def test_unchanged_snapshot_has_no_changes():
+    snapshot = IncrementalSnapshot()
+    snapshot.update('Binance_USDT', ['BTC', 'ETH'])
+    assert snapshot.update('Binance_USDT', ['ETH', 'BTC']) == {}
+    snapshot.update_upbit_quotes({'KRW': ['BTC'], 'USDT': ['ETH']})
+    assert snapshot.update_upbit_quotes({'USDT': ['ETH'], 'KRW': ['BTC']}) == {}
+
+
+def test_asset_moves_between_exchange_categories():
+    snapshot = IncrementalSnapshot()
+    snapshot.update('Binance_USDT', ['BTC', 'ETH'])
+    snapshot.update('Bithumb_KRW', ['BTC'])
+    assert snapshot.category('Binance_Bithumb') == {'BTC'}
+
+    changes = snapshot.update('Bithumb_KRW', ['ETH'])
+    assert changes == {
+        'Binance_Bithumb': ({'ETH'}, {'BTC'}),
+        'Only_Binance': ({'BTC'}, {'ETH'}),
+        # 不在Upbit KRW市场的币安、Bithumb共同币种
+        'Only_Binance_Bithumb': ({'ETH'}, {'BTC'}),
+    }
+
+
+def test_upbit_quote_changes_cancel_within_one_update():
+    snapshot = IncrementalSnapshot(UPBIT_CATEGORIES)
+    snapshot.update_upbit_quotes({'KRW': ['XRP'], 'USDT': ['XRP']})
+    assert snapshot.category('Upbit_KRW_USDT_not_BTC') == {'XRP'}
+
+    # KRW先移出时XRP暂时进入Upbit_only_USDT，BTC加入后又移出，合并后不出现在变化中
+    changes = snapshot.update_upbit_quotes({'USDT': ['XRP'], 'BTC': ['XRP']})
+    assert changes == {
+        'Upbit_KRW_USDT_not_BTC': (set(), {'XRP'}),
+        'Upbit_USDT_BTC_not_KRW': ({'XRP'}, set()),
+    }
+    assert snapshot.category('Upbit_only_USDT') == set()
+
+
+def test_update_upbit_matches_update_upbit_quotes():
+    markets = ['KRW-BTC', 'USDT-BTC', 'BTC-ETH', 'KRW-XRP']
+    by_markets = IncrementalSnapshot()
+    by_quotes = IncrementalSnapshot()
+    assert by_markets.update_upbit(markets) == by_quotes.update_upbit_quotes(
+        {'KRW': ['BTC', 'XRP'], 'USDT': ['BTC'], 'BTC': ['ETH']})
+    assert by_markets.results == by_quotes.results
+
+
+def test_incremental_results_match_fresh_snapshot():
+    rng = random.Random(0)
+    universe = [f'C{i}' for i in range(60)]
+
+    def sample():
+        return rng.sample(universe, rng.randint(0, len(universe)))
+
+    snapshot = IncrementalSnapshot()
+    for _ in range(30):
+        binance, bithumb = sample(), sample()
+        by_quote = {quote: sample() for quote in ('KRW', 'USDT', 'BTC')}
+        before = {name: set(members) for name, members in snapshot.results.items()}
+        changes = snapshot.update_upbit_quotes(by_quote)
+        for source, assets in (('Binance_USDT', binance), ('Bithumb_KRW', bithumb)):
+            for name, (entered, left) in snapshot.update(source, assets).items():
+                old_entered, old_left = changes.get(name, (set(), set()))
+                changes[name] = ((old_entered - left) | (entered - old_left),
+                                 (old_left - entered) | (left - old_entered))
+
+        fresh = IncrementalSnapshot()
+        fresh.update_upbit_quotes(by_quote)
+        fresh.update('Binance_USDT', binance)
+        fresh.update('Bithumb_KRW', bithumb)
+        assert snapshot.results == fresh.results
+
+        # 返回的变化正好把上一次的分类变成本次的分类
+        for name, members in snapshot.results.items():
+            entered, left = changes.get(name, (set(), set()))
+            assert (before[name] - left) | entered == members
@@ -0,0 +1,93 @@
+"""venn_engine的集合运算与直接的集合运算结果一致"""
+import random
+from itertools import combinations
+
+from venn_engine import VennEngine, bitmap_from_ids, iter_bitmap, region_predicates
+
+LABELS = ('Binance', 'Upbit', 'Bithumb')
+
+
+def random_sets(seed, size=200):
+    rng = random.Random(seed)
+    universe = [f'C{i}' for i in range(size)]
+    return {label: set(rng.sample(universe, rng.randint(0, size))) for label in LABELS}
+
+
+def expected_regions(sets, labels):
+    """用集合运算计算每个区域：恰好属于combo中的集合"""
+    result = {}
+    for count in range(len(labels), 0, -1):
+        for combo in combinations(labels, count):
+            region = set.intersection(*(sets[label] for label in combo))
+            for label in labels:
+                if label not in combo:
+                    region -= sets[label]
+            result[combo] = region
+    return result
+
+
+def test_bitmap_round_trip():
+    ids = [0, 3, 7, 8, 64, 1000]
+    assert list(iter_bitmap(bitmap_from_ids(ids, 1001))) == ids
+    assert list(iter_bitmap(0)) == []
+
+
+def test_regions_match_set_algebra():
+    for seed in range(20):
+        sets = random_sets(seed)
+        regions = VennEngine.from_sets(sets).regions()
+        expected = expected_regions(sets, LABELS)
+        assert list(regions) == list(expected)
+        assert {combo: set(assets) for combo, assets in regions.items()} == expected
+
+
+def test_regions_of_selected_labels():
+    sets = random_sets(1)
+    regions = VennEngine.from_sets(sets).regions(['Upbit', 'Binance'])
+    expected = expected_regions(sets, ('Upbit', 'Binance'))
+    assert {combo: set(assets) for combo, assets in regions.items()} == expected
+
+
+def test_empty_regions_are_present():
+    regions = VennEngine.from_sets({'Binance': ['BTC'], 'Upbit': [], 'Bithumb': []}).regions()
+    assert len(regions) == 7
+    assert regions[('Binance',)] == ['BTC']
+    assert regions[('Binance', 'Upbit', 'Bithumb')] == []
+
+
+def test_query():
+    sets = random_sets(2)
+    engine = VennEngine.from_sets(sets)
+    assert set(engine.query(include=['Binance', 'Upbit'], exclude=['Bithumb'])) == \
+        (sets['Binance'] & sets['Upbit']) - sets['Bithumb']
+    assert set(engine.query(exclude=['Upbit'])) == (sets['Binance'] | sets['Bithumb']) - sets['Upbit']
+    assert set(engine.members('Bithumb')) == sets['Bithumb']
+
+
+def test_update_reports_changes_and_keeps_regions_consistent():
+    engine = VennEngine.from_sets({'Binance': ['BTC', 'ETH'], 'Upbit': ['BTC'], 'Bithumb': []})
+    ids = engine.table.ids
+
+    added, removed = engine.update('Upbit', ['ETH', 'XRP'])
+    assert sorted(engine.table.symbols[i] for i in added) == ['ETH', 'XRP']
+    assert [engine.table.symbols[i] for i in removed] == ['BTC']
+    assert engine.masks[ids['BTC']] == engine.bits['Binance']
+
+    # 相同的成员不产生变化
+    assert engine.update('Upbit', ['XRP', 'ETH']) == ([], [])
+
+    sets = {'Binance': {'BTC', 'ETH'}, 'Upbit': {'ETH', 'XRP'}, 'Bithumb': set()}
+    regions = engine.regions()
+    assert {combo: set(assets) for combo, assets in regions.items()} == expected_regions(sets, LABELS)
+
+
+def test_region_predicates():
+    bits = {'KRW': 1, 'USDT': 2, 'BTC': 4}
+    predicates = region_predicates(bits, lambda combo: '_'.join(combo))
+    assert predicates['KRW'](1)
+    assert not predicates['KRW'](3)
+    assert predicates['USDT_BTC'](6)
+    # 不在bits_by_label中的位不影响判断
+    assert predicates['KRW_USDT_BTC'](7 | 8)
+    skipped = region_predicates(bits, lambda combo: None if len(combo) > 1 else combo[0])
+    assert sorted(skipped) == ['BTC', 'KRW', 'USDT']
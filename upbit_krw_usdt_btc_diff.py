@@ -1,51 +1,49 @@
 import requests
-import pandas as pd
+import response_cache
+import exchange_adapters
+from snapshot_diff import IncrementalSnapshot, UPBIT_CATEGORIES
+from market_index import MarketIndex
+from listing_history import ListingHistory
+import listing_resolver
+import report_output
+import argparse
 from datetime import datetime
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
 import os
 
 
+# 上一次的Upbit市场快照及派生组合，同一进程内重复运行main时按增量更新
+upbit_snapshot = IncrementalSnapshot(UPBIT_CATEGORIES)
+
+
 def get_upbit_markets():
     """获取Upbit交易所的所有市场信息"""
-    url = "https://api.upbit.com/v1/market/all"
-    headers = {"accept": "application/json"}
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        return exchange_adapters.ADAPTERS['upbit']().market_details()
     except requests.exceptions.RequestException as e:
         print(f"请求出错: {e}")
         return []
 
 
-def get_coin_listing_dates():
-    """尝试获取加密货币的上币日期（Upbit未直接提供，此为示例实现）"""
-    # 实际应用中应替换为真实的上币日期数据
-    # 这里使用简化的示例，按字母顺序模拟上币日期
-    return {}
-
-
-def filter_pairs(markets, prefix):
-    """从市场信息中筛选出特定前缀的交易对"""
-    return [market for market in markets if market['market'].startswith(prefix)]
+def get_coin_listing_dates(markets, candle_dates=None):
+    """返回各币种在Upbit的上币日期（Upbit未直接提供）
 
+    优先使用最早日K线的日期，查询失败的币种使用上币历史中观察到的首次出现日期
+    （开始记录时就已上架的币种没有日期，不在结果中）。
+    candle_dates为已经查出的{币种: K线日期}，为None时在这里查询。
+    """
+    with ListingHistory() as history:
+        listing_dates = history.listing_dates(venues=('upbit',))
+    if candle_dates is None:
+        pairs = [tuple(market['market'].split('-', 1)) for market in markets]
+        candle_dates = listing_resolver.asset_dates(listing_resolver.resolve('upbit', pairs))
+    listing_dates.update(candle_dates)
+    return listing_dates
 
-def sort_by_listing_date(pairs, listing_dates=None):
-    """按上币日期对交易对进行排序"""
-    if not listing_dates:
-        # 如果没有上币日期数据，按交易对名称排序
-        return sorted(pairs, key=lambda x: x['market'])
-
-    # 使用上币日期排序，未知日期的交易对放在最后
-    return sorted(pairs,
-                  key=lambda x: listing_dates.get(x['market'].split('-')[1], '9999-99-99'))
-
-
-def save_to_excel(pairs, sheet_name, writer, base_currency=None):
-    """将交易对信息保存到Excel的指定工作表中，支持空数据"""
-    workbook = writer.book
 
+def save_to_excel(pairs, sheet_name, writer, base_currency=None, listing_dates=None):
+    """将交易对信息保存到报表的指定工作表中，支持空数据，返回写入的DataFrame"""
+    # pandas只在写报表时导入，获取和分类阶段不需要
+    import pandas as pd
     # 如果没有数据，创建空的DataFrame
     if not pairs:
         df = pd.DataFrame(columns=[
@@ -70,135 +68,123 @@ def save_to_excel(pairs, sheet_name, writer, base_currency=None):
         else:
             df['基础货币'] = sheet_name.split('_')[0].upper()
 
-        df['报价货币'] = df['交易对代码'].apply(lambda x: x.split('-')[1])
+        df['报价货币'] = df['交易对代码'].str.split('-', n=1).str[1]
 
-        # 添加模拟的上币日期列（实际应用中应替换为真实数据）
-        listing_dates = get_coin_listing_dates()
-        df['上币日期(近似)'] = df['报价货币'].apply(lambda x: listing_dates.get(x, '未知'))
+        # 添加上币日期列（K线首个交易日，查不到时为首次出现日期）
+        df['上币日期(近似)'] = df['报价货币'].map(listing_dates or {}).fillna('未知')
 
     # 确保所有列存在
     required_columns = ['交易对代码', '基础货币', '报价货币', '韩文名称', '英文名称', '上币日期(近似)']
     if 'market_warning' in df.columns:
-        required_columns.append('market_warning')
         df = df.rename(columns={'market_warning': '市场警告'})
     else:
         df['市场警告'] = ''
-        required_columns.append('市场警告')
+    required_columns.append('市场警告')
 
     df = df[required_columns]
 
-    # 写入Excel
-    df.to_excel(writer, sheet_name=sheet_name, index=False)
-    worksheet = workbook[sheet_name]
-
-    # 设置列宽
-    for i, col in enumerate(df.columns):
-        column_width = max(len(str(x)) for x in df[col]) if not df.empty else len(col)
-        column_width = max(column_width, len(col)) + 2
-        col_letter = get_column_letter(i + 1)
-        worksheet.column_dimensions[col_letter].width = column_width
-
-    # 设置表头样式
-    if not df.empty:
-        header_font = Font(bold=True)
-        header_alignment = Alignment(vertical='top', wrap_text=True)
-        header_border = Border(left=Side(style='thin'), right=Side(style='thin'),
-                               top=Side(style='thin'), bottom=Side(style='thin'))
-        header_fill = PatternFill(start_color='D7E4BC', end_color='D7E4BC', fill_type='solid')
-
-        for col_num, value in enumerate(df.columns.values):
-            cell = worksheet.cell(row=1, column=col_num + 1, value=value)
-            cell.font = header_font
-            cell.alignment = header_alignment
-            cell.border = header_border
-            cell.fill = header_fill
+    # 写入Excel：列宽按内容设置，有数据时表头使用报表样式
+    writer.write_sheet(sheet_name, df, styled=True, fit_columns=True)
 
     print(f"{sheet_name} 工作表已创建，共 {len(df)} 条记录")
+    return df
 
 
-def main():
+def main(output_format='xlsx', sidecar=None):
     print("正在获取Upbit交易所的所有交易对...")
     markets = get_upbit_markets()
     if not markets:
         print("无法获取市场信息，程序退出。")
         return
 
-    # 获取上币日期数据（示例实现）
-    listing_dates = get_coin_listing_dates()
-
-    # 筛选并排序交易对
-    krw_pairs = sort_by_listing_date(filter_pairs(markets, 'KRW-'), listing_dates)
-    usdt_pairs = sort_by_listing_date(filter_pairs(markets, 'USDT-'), listing_dates)
-    btc_pairs = sort_by_listing_date(filter_pairs(markets, 'BTC-'), listing_dates)
-
-    # 提取交易对名称
-    krw_markets = {pair['market'].split('-')[1] for pair in krw_pairs}
-    usdt_markets = {pair['market'].split('-')[1] for pair in usdt_pairs}
-    btc_markets = {pair['market'].split('-')[1] for pair in btc_pairs}
-
-    # 找出仅在特定市场的交易对并排序
-    only_krw = sort_by_listing_date(
-        [pair for pair in krw_pairs if
-         pair['market'].split('-')[1] not in usdt_markets and pair['market'].split('-')[1] not in btc_markets],
-        listing_dates
-    )
-    only_usdt = sort_by_listing_date(
-        [pair for pair in usdt_pairs if
-         pair['market'].split('-')[1] not in krw_markets and pair['market'].split('-')[1] not in btc_markets],
-        listing_dates
-    )
-    only_btc = sort_by_listing_date(
-        [pair for pair in btc_pairs if
-         pair['market'].split('-')[1] not in krw_markets and pair['market'].split('-')[1] not in usdt_markets],
-        listing_dates
-    )
-
-    # 找出三种市场全有的交易对并排序
-    all_markets = sort_by_listing_date(
-        [pair for pair in krw_pairs if
-         pair['market'].split('-')[1] in usdt_markets and pair['market'].split('-')[1] in btc_markets],
-        listing_dates
-    )
+    # 记录本次快照到上币历史
+    with ListingHistory() as history:
+        history.record('upbit', [tuple(market['market'].split('-', 1)) for market in markets])
+
+    # 获取上币日期数据
+    listing_dates = get_coin_listing_dates(markets)
+
+    # 市场只解析一次：按报价货币分组并排好序（没有上币日期数据时按交易对代码排序）
+    index = MarketIndex(markets, listing_dates or None)
+
+    # 用本次快照增量更新各市场组合：只有新增或移除的币种会被重新归类
+    upbit_snapshot.update_upbit_quotes(index.bases_by_quote())
+
+    sheets = build_sheets(index, upbit_snapshot.results)
+    write_report(sheets, listing_dates, output_format, sidecar)
+
+
+def build_sheets(index, categories):
+    """按市场索引和各市场组合整理各工作表，返回[(交易对, 工作表名, 基础货币), ...]"""
+    krw_pairs = index.pairs('KRW')
+    usdt_pairs = index.pairs('USDT')
+    btc_pairs = index.pairs('BTC')
+
+    # 找出仅在特定市场的交易对（索引已排序，筛选结果保持顺序）
+    only_krw = index.select('KRW', categories['Upbit_only_KRW'])
+    only_usdt = index.select('USDT', categories['Upbit_only_USDT'])
+    only_btc = index.select('BTC', categories['Upbit_only_BTC'])
+
+    # 找出三种市场全有的交易对
+    all_markets = index.select('KRW', categories['Upbit_all_markets'])
 
     # 找出在USDT和BTC市场同时存在，并且不在KRW市场的交易对
-    usdt_btc_not_krw = sort_by_listing_date(
-        [pair for pair in usdt_pairs if
-         pair['market'].split('-')[1] in btc_markets and pair['market'].split('-')[1] not in krw_markets],
-        listing_dates
-    )
-
-    # 创建output文件夹
-    output_dir = 'output'
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    # 生成文件名
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = os.path.join(output_dir, f'upbit_pairs_{timestamp}.xlsx')
-
-    # 写入Excel文件
-    with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-        # 写入主要市场数据
-        save_to_excel(krw_pairs, 'KRW_pairs', writer)
-        save_to_excel(usdt_pairs, 'USDT_pairs', writer)
-        save_to_excel(btc_pairs, 'BTC_pairs', writer)
-
-        # 写入仅存在于单一市场的数据（确保即使为空也创建sheet）
-        save_to_excel(only_krw, 'only_KRW_pairs', writer, 'KRW')
-        save_to_excel(only_usdt, 'only_USDT_pairs', writer, 'USDT')
-        save_to_excel(only_btc, 'only_BTC_pairs', writer, 'BTC')
-
-        # 写入三种市场全有的数据
-        save_to_excel(all_markets, 'all_markets_pairs', writer)
-
-        # 写入在USDT和BTC市场同时存在，并且不在KRW市场的交易对
-        save_to_excel(usdt_btc_not_krw, 'usdt_btc_not_krw_pairs', writer)
+    usdt_btc_not_krw = index.select('USDT', categories['Upbit_USDT_BTC_not_KRW'])
+
+    # (交易对, 工作表名, 基础货币)
+    return [
+        # 主要市场数据
+        (krw_pairs, 'KRW_pairs', None),
+        (usdt_pairs, 'USDT_pairs', None),
+        (btc_pairs, 'BTC_pairs', None),
+        # 仅存在于单一市场的数据（确保即使为空也创建sheet）
+        (only_krw, 'only_KRW_pairs', 'KRW'),
+        (only_usdt, 'only_USDT_pairs', 'USDT'),
+        (only_btc, 'only_BTC_pairs', 'BTC'),
+        # 三种市场全有的数据
+        (all_markets, 'all_markets_pairs', None),
+        # 在USDT和BTC市场同时存在，并且不在KRW市场的交易对
+        (usdt_btc_not_krw, 'usdt_btc_not_krw_pairs', None),
+    ]
+
+
+def write_report(sheets, listing_dates, output_format='xlsx', sidecar=None, stem=None):
+    """写入各工作表，stem为不带扩展名的输出路径，默认按当前时间生成，返回输出文件名"""
+    if stem is None:
+        # 创建output文件夹
+        output_dir = 'output'
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        # 生成文件名
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        stem = os.path.join(output_dir, f'upbit_pairs_{timestamp}')
+
+    # 写入报表（Excel或每个工作表一个列式文件）
+    with report_output.open_writer(stem, output_format) as writer:
+        frames = {sheet_name: save_to_excel(pairs, sheet_name, writer, base_currency, listing_dates)
+                  for pairs, sheet_name, base_currency in sheets}
+    filename = writer.filename
+
+    if sidecar:
+        # 报价货币列为各交易对的基础货币
+        sets = {sheet_name: df[report_output.ASSET_COLUMN] for sheet_name, df in frames.items()}
+        print(f"分类币种列表已保存到: {report_output.write_sidecar(sets, filename, sidecar)}")
 
     print(f"\n数据已成功保存到: {filename}")
     print(
         "包含的工作表有: KRW_pairs, USDT_pairs, BTC_pairs, only_KRW_pairs, only_USDT_pairs, only_BTC_pairs, all_markets_pairs, usdt_btc_not_krw_pairs")
     print("所有工作表均按上币日期（或近似顺序）排序")
+    return filename
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Upbit KRW/USDT/BTC市场交易对比较")
+    parser.add_argument('--refresh', action='store_true', help="忽略本地缓存，强制重新获取交易所数据")
+    report_output.add_arguments(parser, format_help="输出格式：xlsx为单个Excel文件，其余格式每个工作表输出一个文件",
+                                sidecar_help="在报表旁边额外输出分类币种长表(category, asset)的格式")
+    args = parser.parse_args()
+    report_output.validate_args(parser, args)
+    response_cache.set_refresh(args.refresh)
+
+    main(args.format, args.sidecar)
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""基于位图的N个集合成员关系计算
+
+币种字符串映射为连续的整数ID，每个集合（交易所或报价市场）保存为一个位图（Python整数，
+第i位表示ID为i的币种）。同时为每个币种维护一个成员掩码（第k位表示属于第k个集合），
+一次遍历即可把所有币种分到2^N个维恩区域中，增加集合数量不会增加集合减法的轮数。
+"""
+from itertools import combinations
+
+
+class SymbolTable:
+    """币种字符串与整数ID的双向映射"""
+
+    def __init__(self):
+        self.ids = {}
+        self.symbols = []
+
+    def intern(self, symbol):
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self.ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+        return symbol_id
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+def bitmap_from_ids(ids, size):
+    """由ID集合构建位图"""
+    data = bytearray((size + 7) // 8)
+    for symbol_id in ids:
+        data[symbol_id >> 3] |= 1 << (symbol_id & 7)
+    return int.from_bytes(data, 'little')
+
+
+def iter_bitmap(bitmap):
+    """按从小到大的顺序产出位图中为1的ID"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield (index << 3) + low.bit_length() - 1
+            byte ^= low
+
+
+class VennEngine:
+    """N个命名集合的位图表示及维恩区域计算"""
+
+    def __init__(self, labels):
+        self.labels = list(labels)
+        self.bits = {label: 1 << k for k, label in enumerate(self.labels)}
+        self.table = SymbolTable()
+        self.masks = []
+        self.bitmaps = {label: 0 for label in self.labels}
+
+    @classmethod
+    def from_sets(cls, sets):
+        """由{名称: 币种集合}一次性构建"""
+        engine = cls(sets)
+        for label, symbols in sets.items():
+            engine.update(label, symbols)
+        return engine
+
+    def update(self, label, symbols):
+        """用最新成员替换集合，返回(新增的ID列表, 移除的ID列表)"""
+        bit = self.bits[label]
+        ids = [self.table.intern(symbol) for symbol in symbols]
+        if len(self.masks) < len(self.table):
+            self.masks.extend([0] * (len(self.table) - len(self.masks)))
+
+        old_bitmap = self.bitmaps[label]
+        new_bitmap = bitmap_from_ids(ids, len(self.table))
+        self.bitmaps[label] = new_bitmap
+        changed = old_bitmap ^ new_bitmap
+
+        masks = self.masks
+        added = list(iter_bitmap(changed & new_bitmap))
+        removed = list(iter_bitmap(changed & old_bitmap))
+        for symbol_id in added:
+            masks[symbol_id] |= bit
+        for symbol_id in removed:
+            masks[symbol_id] &= ~bit
+        return added, removed
+
+    def members(self, label):
+        """返回集合的币种列表"""
+        symbols = self.table.symbols
+        return [symbols[i] for i in iter_bitmap(self.bitmaps[label])]
+
+    def query(self, include=(), exclude=()):
+        """返回属于include中所有集合、且不属于exclude中任何集合的币种"""
+        if include:
+            result = -1
+            for label in include:
+                result &= self.bitmaps[label]
+        else:
+            result = 0
+            for bitmap in self.bitmaps.values():
+                result |= bitmap
+        for label in exclude:
+            result &= ~self.bitmaps[label]
+        symbols = self.table.symbols
+        return [symbols[i] for i in iter_bitmap(result)]
+
+    def regions(self, labels=None):
+        """一次遍历计算所有维恩区域
+
+        返回{区域: 币种列表}，区域为按labels顺序排列的集合名称元组，表示恰好属于这些集合；
+        所有2^N-1个非空组合都会出现在结果中（没有币种时为空列表）。
+        """
+        labels = self.labels if labels is None else list(labels)
+        selected = 0
+        for label in labels:
+            selected |= self.bits[label]
+
+        region_by_mask = {}
+        result = {}
+        for size in range(len(labels), 0, -1):
+            for combo in combinations(labels, size):
+                mask = 0
+                for label in combo:
+                    mask |= self.bits[label]
+                region_by_mask[mask] = combo
+                result[combo] = []
+
+        symbols = self.table.symbols
+        for symbol_id, mask in enumerate(self.masks):
+            mask &= selected
+            if mask:
+                result[region_by_mask[mask]].append(symbols[symbol_id])
+        return result
+
+
+def region_predicates(bits_by_label, name_for):
+    """为每个维恩区域生成成员掩码判断函数
+
+    bits_by_label为{集合名称: 掩码位}，name_for(区域元组)返回分类名称（返回None则跳过）。
+    返回{分类名称: predicate(mask)}，predicate在掩码恰好落在该区域时为真。
+    """
+    labels = list(bits_by_label)
+    selected = 0
+    for bit in bits_by_label.values():
+        selected |= bit
+
+    predicates = {}
+    for size in range(len(labels), 0, -1):
+        for combo in combinations(labels, size):
+            name = name_for(combo)
+            if name is None:
+                continue
+            wanted = 0
+            for label in combo:
+                wanted |= bits_by_label[label]
+            predicates[name] = lambda m, wanted=wanted: m & selected == wanted
+    return predicates